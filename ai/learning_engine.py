@@ -6,17 +6,78 @@ Simplified version without heavy ML dependencies
 import re
 import json
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
+from functools import lru_cache
 from collections import Counter, defaultdict
+from itertools import islice, repeat
 import string
 
+# The third-party `regex` engine, when installed, handles the preference
+# patterns faster; the standard library `re` module is used otherwise
+try:
+    import regex as _preference_re
+except ImportError:
+    _preference_re = re
+
 from models import UserInteraction, LearnedFact, UserInsight, LearningResult, InteractionType, LearningConfidence
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Number of distinct texts whose analysis results are memoized per analyzer
+CONTENT_CACHE_SIZE = 4096
+
+# Texts shorter than this cannot contain a sentiment word or a topic
+MIN_ANALYZABLE_LENGTH = 3
+
+# Tokenization drops every non-word, non-space character; the translate table
+# applies the same rule to ASCII text without going through the regex engine
+_NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+_ASCII_NON_WORD_TABLE = str.maketrans({
+    char: ' ' for char in map(chr, range(128)) if _NON_WORD_PATTERN.match(char)
+})
+
+# Basic stop words (simplified list)
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from',
+    'has', 'he', 'in', 'is', 'it', 'its', 'of', 'on', 'that', 'the',
+    'to', 'was', 'were', 'will', 'with', 'i', 'you', 'me', 'we', 'they',
+    'this', 'that', 'these', 'those', 'am', 'can', 'could', 'should',
+    'would', 'have', 'had', 'has'
+})
+
+# Sentiment words (basic positive/negative indicators)
+POSITIVE_WORDS = frozenset({
+    'love', 'like', 'enjoy', 'amazing', 'awesome', 'great', 'fantastic',
+    'wonderful', 'excellent', 'perfect', 'good', 'best', 'beautiful',
+    'happy', 'pleased', 'excited', 'thrilled', 'appreciate', 'thanks'
+})
+
+NEGATIVE_WORDS = frozenset({
+    'hate', 'dislike', 'awful', 'terrible', 'horrible', 'bad', 'worst',
+    'annoying', 'frustrated', 'angry', 'disappointed', 'confused',
+    'difficult', 'problem', 'issue', 'wrong', 'error', 'fail'
+})
+
+# Intent keywords, in priority order (first matching intent wins)
+INTENT_KEYWORDS = {
+    'help_request': ('help', 'how', 'what', 'explain', 'tell me'),
+    'preference_expression': ('like', 'love', 'prefer', 'enjoy'),
+    'gratitude': ('thank', 'thanks', 'appreciate'),
+    'greeting': ('hello', 'hi', 'hey', 'good morning')
+}
+
+# Communication style indicators
+STYLE_INDICATORS = {
+    'formal': ('please', 'thank you', 'could you', 'would you', 'sir', 'madam', 'kindly'),
+    'casual': ('hey', 'hi', 'cool', 'awesome', 'yeah', 'nah', 'gonna', 'wanna', 'sup'),
+    'technical': ('algorithm', 'function', 'variable', 'database', 'api', 'framework', 'code'),
+    'friendly': ('thanks', 'appreciate', 'great', 'wonderful', 'excited', '!', 'amazing')
+}
+
 
 @dataclass
 class ProcessingStats:
@@ -33,31 +94,34 @@ class ProcessingStats:
             self.errors = []
 
 
+@dataclass
+class InteractionColumns:
+    """Column-wise view of a batch of interactions, built once per pattern analysis"""
+    timestamps: List[datetime]
+    sentiments: List[float]
+    content_lengths: List[int]
+    interaction_types: List[str]
+    topics: List[List[str]]
+    
+    @classmethod
+    def from_interactions(cls, interactions: List[UserInteraction]) -> 'InteractionColumns':
+        return cls(
+            timestamps=[interaction.timestamp for interaction in interactions],
+            sentiments=[interaction.sentiment or 0 for interaction in interactions],
+            content_lengths=[len(interaction.content or '') for interaction in interactions],
+            interaction_types=[interaction.interaction_type for interaction in interactions],
+            topics=[interaction.topics for interaction in interactions if interaction.topics]
+        )
+
+
 class SimpleTextAnalyzer:
     """Simplified text analysis without external dependencies"""
     
     def __init__(self):
-        # Basic stop words (simplified list)
-        self.stop_words = {
-            'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from',
-            'has', 'he', 'in', 'is', 'it', 'its', 'of', 'on', 'that', 'the',
-            'to', 'was', 'were', 'will', 'with', 'i', 'you', 'me', 'we', 'they',
-            'this', 'that', 'these', 'those', 'am', 'can', 'could', 'should',
-            'would', 'have', 'had', 'has'
-        }
-        
-        # Sentiment words (basic positive/negative indicators)
-        self.positive_words = {
-            'love', 'like', 'enjoy', 'amazing', 'awesome', 'great', 'fantastic',
-            'wonderful', 'excellent', 'perfect', 'good', 'best', 'beautiful',
-            'happy', 'pleased', 'excited', 'thrilled', 'appreciate', 'thanks'
-        }
-        
-        self.negative_words = {
-            'hate', 'dislike', 'awful', 'terrible', 'horrible', 'bad', 'worst',
-            'annoying', 'frustrated', 'angry', 'disappointed', 'confused',
-            'difficult', 'problem', 'issue', 'wrong', 'error', 'fail'
-        }
+        # Shared module-level word lists
+        self.stop_words = STOP_WORDS
+        self.positive_words = POSITIVE_WORDS
+        self.negative_words = NEGATIVE_WORDS
         
         # Common patterns for preference extraction
         self.preference_patterns = {
@@ -88,79 +152,123 @@ class SimpleTextAnalyzer:
             ]
         }
         
-        # Communication style indicators
-        self.style_indicators = {
-            'formal': ['please', 'thank you', 'could you', 'would you', 'sir', 'madam', 'kindly'],
-            'casual': ['hey', 'hi', 'cool', 'awesome', 'yeah', 'nah', 'gonna', 'wanna', 'sup'],
-            'technical': ['algorithm', 'function', 'variable', 'database', 'api', 'framework', 'code'],
-            'friendly': ['thanks', 'appreciate', 'great', 'wonderful', 'excited', '!', 'amazing']
+        # Compile preference patterns once so extraction doesn't re-parse them
+        # per call. Each pattern is scanned on its own: a single alternation
+        # would drop matches that overlap a match of another pattern
+        self._preference_patterns = {
+            pref_type: [_preference_re.compile(pattern, _preference_re.IGNORECASE) for pattern in patterns]
+            for pref_type, patterns in self.preference_patterns.items()
         }
+        
+        # Communication style indicators
+        self.style_indicators = STYLE_INDICATORS
+        
+        # All intent keywords as one whole-word alternation, tagged by intent
+        self._intent_pattern = re.compile('|'.join(
+            f"\\b(?P<{intent}>{'|'.join(re.escape(keyword) for keyword in keywords)})\\b"
+            for intent, keywords in INTENT_KEYWORDS.items()
+        ), re.IGNORECASE)
+        self._intent_priority = {intent: rank for rank, intent in enumerate(INTENT_KEYWORDS)}
+        
+        # Analysis results are pure functions of the text; short chat replies
+        # ("ok", "thanks") repeat constantly, so keep recent results around
+        self._analyze_content_cached = lru_cache(maxsize=CONTENT_CACHE_SIZE)(self._analyze_content)
+        
+        # Single lexicon mapping sentiment words to their polarity, so scoring
+        # needs one lookup per token instead of one per word set
+        self._sentiment_lexicon = {word: 1 for word in self.positive_words}
+        self._sentiment_lexicon.update({word: -1 for word in self.negative_words})
     
     def simple_tokenize(self, text: str) -> List[str]:
         """Simple word tokenization"""
-        # Remove punctuation and convert to lowercase
-        text = re.sub(r'[^\w\s]', ' ', text.lower())
-        # Split on whitespace and filter empty strings
-        return [token for token in text.split() if token]
+        return self._tokenize_lowered(text.lower())
+    
+    def _tokenize_lowered(self, text: str) -> List[str]:
+        """Tokenize text that has already been lowercased"""
+        # Remove punctuation; plain ASCII text takes the translate fast path,
+        # anything else needs the Unicode-aware regex
+        if text.isascii():
+            return text.translate(_ASCII_NON_WORD_TABLE).split()
+        return _NON_WORD_PATTERN.sub(' ', text).split()
     
     def analyze_sentiment(self, text: str) -> float:
         """Simple sentiment analysis (-1 to 1)"""
         try:
-            tokens = self.simple_tokenize(text)
-            positive_count = sum(1 for token in tokens if token in self.positive_words)
-            negative_count = sum(1 for token in tokens if token in self.negative_words)
-            
-            total_sentiment_words = positive_count + negative_count
-            if total_sentiment_words == 0:
-                return 0.0
-            
-            # Simple sentiment score
-            sentiment = (positive_count - negative_count) / max(len(tokens), 1)
-            return max(-1.0, min(1.0, sentiment * 2))  # Scale and clamp
+            return self._analyze_content_cached(text)[0]
             
         except Exception as e:
-            logger.error(f"Sentiment analysis error: {e}")
+            logger.error("Sentiment analysis error: %s", e)
             return 0.0
     
     def extract_topics(self, text: str) -> List[str]:
         """Extract key topics/keywords from text"""
         try:
-            tokens = self.simple_tokenize(text)
-            
-            # Remove stop words and short tokens
-            filtered_tokens = [
-                token for token in tokens 
-                if token not in self.stop_words and len(token) > 2
-            ]
-            
-            # Get word frequencies
-            word_freq = Counter(filtered_tokens)
-            
-            # Return top topics
-            return [word for word, freq in word_freq.most_common(10)]
+            return list(self._analyze_content_cached(text)[1])
         
         except Exception as e:
-            logger.error(f"Topic extraction error: {e}")
+            logger.error("Topic extraction error: %s", e)
             return []
     
+    def analyze_content(self, text: str) -> Tuple[float, List[str], str]:
+        """Return sentiment, topics and intent for a text, tokenizing it only once"""
+        sentiment, topics, intent = self._analyze_content_cached(text)
+        return sentiment, list(topics), intent
+    
+    def content_cache_info(self):
+        """Hit/miss statistics of the content analysis cache"""
+        return self._analyze_content_cached.cache_info()
+    
+    def _analyze_content(self, text: str) -> Tuple[float, Tuple[str, ...], str]:
+        """Uncached content analysis; topics are a tuple so cached results stay immutable"""
+        # Sentiment words and topics are all at least 3 characters long, so very
+        # short texts ("ok", "hi", "?") only need their intent classified
+        if len(text) < MIN_ANALYZABLE_LENGTH:
+            return 0.0, (), self.classify_intent(text)
+        
+        tokens = self.simple_tokenize(text)
+        return self._score_sentiment(tokens), tuple(self._top_topics(tokens)), self.classify_intent(text)
+    
+    def _score_sentiment(self, tokens: List[str]) -> float:
+        """Score already tokenized text (-1 to 1)"""
+        # Positive words count +1 and negative words -1; map/sum keep the
+        # per-token loop in C. Equal positive and negative counts net to 0.
+        net_sentiment = sum(map(self._sentiment_lexicon.get, tokens, repeat(0)))
+        if net_sentiment == 0:
+            return 0.0
+        
+        # Simple sentiment score
+        sentiment = net_sentiment / len(tokens)
+        return max(-1.0, min(1.0, sentiment * 2))  # Scale and clamp
+    
+    def _top_topics(self, tokens: List[str]) -> List[str]:
+        """Pick the most frequent meaningful words from already tokenized text"""
+        # Get word frequencies
+        word_freq = Counter(tokens)
+        
+        # Remove stop words and short tokens, checking each distinct word once
+        stop_words = self.stop_words
+        for word in [word for word in word_freq if len(word) <= 2 or word in stop_words]:
+            del word_freq[word]
+        
+        # Return top topics
+        return [word for word, freq in word_freq.most_common(10)]
+    
     def extract_preferences(self, text: str) -> Dict[str, List[str]]:
         """Extract preferences from text using pattern matching"""
         preferences = defaultdict(list)
-        text = text.lower()
         
         try:
-            for pref_type, patterns in self.preference_patterns.items():
+            for pref_type, patterns in self._preference_patterns.items():
                 for pattern in patterns:
-                    matches = re.finditer(pattern, text, re.IGNORECASE)
-                    for match in matches:
+                    for match in pattern.finditer(text):
                         groups = match.groups()
                         if groups:
-                            preference = groups[-1].strip()
+                            preference = groups[-1].strip().lower()
                             if preference and len(preference) > 2:
                                 preferences[pref_type].append(preference)
         
         except Exception as e:
-            logger.error(f"Preference extraction error: {e}")
+            logger.error("Preference extraction error: %s", e)
         
         return dict(preferences)
     
@@ -170,32 +278,36 @@ class SimpleTextAnalyzer:
         style_scores = {}
         
         try:
-            total_words = len(self.simple_tokenize(text))
+            total_words = len(self._tokenize_lowered(text))
             if total_words == 0:
                 return style_scores
             
+            # Count the indicators present for each style; map() over the
+            # C substring search avoids a Python-level loop per indicator
+            contains = text.__contains__
             for style, indicators in self.style_indicators.items():
-                score = sum(1 for indicator in indicators if indicator in text)
-                style_scores[style] = score / total_words
+                style_scores[style] = sum(map(contains, indicators)) / total_words
         
         except Exception as e:
-            logger.error(f"Communication style analysis error: {e}")
+            logger.error("Communication style analysis error: %s", e)
         
         return style_scores
     
     def classify_intent(self, text: str) -> str:
         """Classify the intent of user message"""
-        text = text.lower()
-        
-        # Simple rule-based intent classification
-        if any(word in text for word in ['help', 'how', 'what', 'explain', 'tell me']):
-            return 'help_request'
-        elif any(word in text for word in ['like', 'love', 'prefer', 'enjoy']):
-            return 'preference_expression'
-        elif any(word in text for word in ['thank', 'thanks', 'appreciate']):
-            return 'gratitude'
-        elif any(word in text for word in ['hello', 'hi', 'hey', 'good morning']):
-            return 'greeting'
+        # Simple rule-based intent classification: one scan finds every keyword,
+        # and the highest-priority intent among them wins
+        best_intent = None
+        best_rank = len(self._intent_priority)
+        for match in self._intent_pattern.finditer(text):
+            rank = self._intent_priority[match.lastgroup]
+            if rank < best_rank:
+                best_intent, best_rank = match.lastgroup, rank
+                if rank == 0:
+                    break
+        
+        if best_intent:
+            return best_intent
         elif '?' in text:
             return 'question'
         else:
@@ -216,25 +328,30 @@ class SimplePatternAnalyzer:
             return patterns
         
         try:
+            # Gather each field once and share the columns between analyzers
+            columns = InteractionColumns.from_interactions(interactions)
+            
             # Analyze time patterns
-            patterns['active_hours'] = self._analyze_time_patterns(interactions)
-            patterns['interaction_frequency'] = self._analyze_frequency_patterns(interactions)
-            patterns['content_patterns'] = self._analyze_content_patterns(interactions)
-            patterns['sentiment_trends'] = self._analyze_sentiment_trends(interactions)
-            patterns['topic_preferences'] = self._analyze_topic_patterns(interactions)
+            patterns['active_hours'] = self._analyze_time_patterns(columns)
+            patterns['interaction_frequency'] = self._analyze_frequency_patterns(columns)
+            patterns['content_patterns'] = self._analyze_content_patterns(columns)
+            patterns['sentiment_trends'] = self._analyze_sentiment_trends(columns)
+            patterns['topic_preferences'] = self._analyze_topic_patterns(columns)
         
         except Exception as e:
-            logger.error(f"Pattern analysis error: {e}")
+            logger.error("Pattern analysis error: %s", e)
         
         return patterns
     
-    def _analyze_time_patterns(self, interactions: List[UserInteraction]) -> Dict[str, Any]:
+    def _analyze_time_patterns(self, columns: InteractionColumns) -> Dict[str, Any]:
         """Analyze when user is most active"""
-        hours = [interaction.timestamp.hour for interaction in interactions]
-        days = [interaction.timestamp.weekday() for interaction in interactions]
-        
-        hour_counts = Counter(hours)
-        day_counts = Counter(days)
+        # Both counters are filled in a single pass over the timestamps. They
+        # keep first-seen order, so ties go to the hour/day seen first
+        hour_counts = Counter()
+        day_counts = Counter()
+        for timestamp in columns.timestamps:
+            hour_counts[timestamp.hour] += 1
+            day_counts[timestamp.weekday()] += 1
         
         return {
             'most_active_hour': hour_counts.most_common(1)[0][0] if hour_counts else None,
@@ -242,44 +359,49 @@ class SimplePatternAnalyzer:
             'activity_distribution': dict(hour_counts)
         }
     
-    def _analyze_frequency_patterns(self, interactions: List[UserInteraction]) -> Dict[str, Any]:
+    def _analyze_frequency_patterns(self, columns: InteractionColumns) -> Dict[str, Any]:
         """Analyze interaction frequency patterns"""
-        if len(interactions) < 2:
-            return {'interaction_count': len(interactions)}
+        timestamps = columns.timestamps
+        if len(timestamps) < 2:
+            return {'interaction_count': len(timestamps)}
         
-        # Sort by timestamp
-        sorted_interactions = sorted(interactions, key=lambda x: x.timestamp)
+        # The gaps between consecutive interactions sum to the overall span,
+        # so the average gap only needs the earliest and latest timestamps
+        span = max(timestamps) - min(timestamps)
         
-        # Calculate time differences
-        time_diffs = []
-        for i in range(1, len(sorted_interactions)):
-            diff = sorted_interactions[i].timestamp - sorted_interactions[i-1].timestamp
-            time_diffs.append(diff.total_seconds() / 3600)  # Convert to hours
-        
-        avg_time_between = sum(time_diffs) / len(time_diffs) if time_diffs else 0
-        
-        date_range = (sorted_interactions[-1].timestamp - sorted_interactions[0].timestamp).days
+        avg_time_between = span.total_seconds() / 3600 / (len(timestamps) - 1)  # In hours
+        date_range = span.days
         
         return {
             'average_time_between_interactions_hours': avg_time_between,
-            'interaction_count': len(interactions),
+            'interaction_count': len(timestamps),
             'date_range_days': date_range
         }
     
-    def _analyze_content_patterns(self, interactions: List[UserInteraction]) -> Dict[str, Any]:
+    @staticmethod
+    def _split_averages(values: List[float]) -> Tuple[float, float, float]:
+        """Return the overall, first-half and second-half averages of a non-empty sequence"""
+        count = len(values)
+        half = count // 2
+        total = sum(values)
+        first_total = sum(islice(values, half))
+        first_avg = first_total / half if half else 0
+        # The second half's sum is what remains of the total
+        second_avg = (total - first_total) / (count - half)
+        return total / count, first_avg, second_avg
+    
+    def _analyze_content_patterns(self, columns: InteractionColumns) -> Dict[str, Any]:
         """Analyze content patterns"""
-        content_lengths = [len(interaction.content or '') for interaction in interactions]
-        interaction_types = [interaction.interaction_type for interaction in interactions]
+        content_lengths = columns.content_lengths
+        if not content_lengths:
+            return {'average_content_length': 0, 'content_length_trend': 'stable', 'interaction_types': {}}
+        
+        type_counts = Counter(columns.interaction_types)
         
-        avg_length = sum(content_lengths) / len(content_lengths) if content_lengths else 0
-        type_counts = Counter(interaction_types)
+        avg_length, first_avg, second_avg = self._split_averages(content_lengths)
         
         # Simple trend analysis
         if len(content_lengths) > 5:
-            first_half = content_lengths[:len(content_lengths)//2]
-            second_half = content_lengths[len(content_lengths)//2:]
-            first_avg = sum(first_half) / len(first_half)
-            second_avg = sum(second_half) / len(second_half)
             trend = 'increasing' if second_avg > first_avg * 1.1 else 'decreasing' if second_avg < first_avg * 0.9 else 'stable'
         else:
             trend = 'stable'
@@ -290,22 +412,16 @@ class SimplePatternAnalyzer:
             'interaction_types': dict(type_counts)
         }
     
-    def _analyze_sentiment_trends(self, interactions: List[UserInteraction]) -> Dict[str, Any]:
+    def _analyze_sentiment_trends(self, columns: InteractionColumns) -> Dict[str, Any]:
         """Analyze sentiment trends"""
-        sentiments = [interaction.sentiment or 0 for interaction in interactions]
-        
+        sentiments = columns.sentiments
         if not sentiments:
             return {'average_sentiment': 0, 'sentiment_trend': 'stable'}
         
-        avg_sentiment = sum(sentiments) / len(sentiments)
+        avg_sentiment, first_avg, second_avg = self._split_averages(sentiments)
         
         # Simple trend analysis
         if len(sentiments) > 5:
-            first_half = sentiments[:len(sentiments)//2]
-            second_half = sentiments[len(sentiments)//2:]
-            first_avg = sum(first_half) / len(first_half)
-            second_avg = sum(second_half) / len(second_half)
-            
             if second_avg > first_avg + 0.1:
                 trend = 'improving'
             elif second_avg < first_avg - 0.1:
@@ -320,18 +436,15 @@ class SimplePatternAnalyzer:
             'sentiment_trend': trend
         }
     
-    def _analyze_topic_patterns(self, interactions: List[UserInteraction]) -> Dict[str, Any]:
+    def _analyze_topic_patterns(self, columns: InteractionColumns) -> Dict[str, Any]:
         """Analyze topic patterns"""
-        all_topics = []
-        for interaction in interactions:
-            if interaction.topics:
-                all_topics.extend(interaction.topics)
-        
-        topic_counts = Counter(all_topics)
+        topic_counts = Counter()
+        for topics in columns.topics:
+            topic_counts.update(topics)
         
         return {
             'top_topics': dict(topic_counts.most_common(10)),
-            'topic_diversity': len(set(all_topics))
+            'topic_diversity': len(topic_counts)
         }
 
 
@@ -344,17 +457,17 @@ class LearningEngine:
     
     def process_user_interactions(self, user_id: int, interactions: List[UserInteraction]) -> LearningResult:
         """Process user interactions and extract learning insights"""
-        start_time = datetime.utcnow()
+        start_ns = time.perf_counter_ns()
         stats = ProcessingStats()
         new_facts = []
         updated_facts = []
         insights = []
         
         try:
-            # Analyze each interaction
-            for interaction in interactions:
-                if not interaction.processed:
-                    self._analyze_single_interaction(interaction, stats)
+            # Analyze all unprocessed interactions in one batch
+            self._analyze_interactions(
+                [interaction for interaction in interactions if not interaction.processed], stats
+            )
             
             # Analyze patterns across all interactions
             patterns = self.pattern_analyzer.analyze_interaction_patterns(interactions)
@@ -367,48 +480,53 @@ class LearningEngine:
             insights = self._generate_insights(user_id, interactions, patterns)
             
             # Calculate processing time
-            processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
-            stats.processing_time_ms = int(processing_time)
+            stats.processing_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             stats.interactions_processed = len(interactions)
             stats.facts_learned = len(new_facts)
             stats.insights_generated = len(insights)
         
         except Exception as e:
-            logger.error(f"Learning engine error: {e}")
+            logger.error("Learning engine error: %s", e)
             stats.errors.append(str(e))
         
         return LearningResult(
             user_id=user_id,
-            new_facts=[fact.__dict__ if hasattr(fact, '__dict__') else fact for fact in new_facts],
+            new_facts=new_facts,
             updated_facts=updated_facts,
             insights=insights,
             processing_time_ms=stats.processing_time_ms,
             errors=stats.errors
         )
     
-    def _analyze_single_interaction(self, interaction: UserInteraction, stats: ProcessingStats):
-        """Analyze a single interaction and update its metadata"""
-        try:
-            content = interaction.content or ''
-            
-            # Sentiment analysis
-            if not interaction.sentiment:
-                interaction.sentiment = self.text_analyzer.analyze_sentiment(content)
+    def _analyze_interactions(self, interactions: List[UserInteraction], stats: ProcessingStats):
+        """Analyze a batch of interactions and update their metadata"""
+        # The cached analyzer is bound once for the whole batch; each row keeps
+        # its own try so one bad interaction doesn't drop the rest of the batch
+        analyze = self.text_analyzer.analyze_content
+        for interaction in interactions:
+            if interaction.sentiment and interaction.topics and interaction.intent:
+                continue
             
-            # Topic extraction
-            if not interaction.topics:
-                interaction.topics = self.text_analyzer.extract_topics(content)
+            try:
+                # Empty content analyzes to the neutral defaults (0.0, [], 'statement');
+                # sentiment, topics and intent share a single tokenization pass
+                sentiment, topics, intent = analyze(interaction.content or '')
+                
+                if not interaction.sentiment:
+                    interaction.sentiment = sentiment
+                
+                if not interaction.topics:
+                    interaction.topics = topics
+                
+                if not interaction.intent:
+                    interaction.intent = intent
             
-            # Intent classification
-            if not interaction.intent:
-                interaction.intent = self.text_analyzer.classify_intent(content)
-        
-        except Exception as e:
-            logger.error(f"Single interaction analysis error: {e}")
-            stats.errors.append(f"Interaction {interaction.id}: {str(e)}")
+            except Exception as e:
+                logger.error("Interaction analysis error: %s", e)
+                stats.errors.append(f"Interaction {interaction.id}: {str(e)}")
     
     def _generate_facts_from_patterns(self, user_id: int, patterns: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate learned facts from identified patterns"""
+        """Generate learned facts from identified patterns; each fact is a plain dict"""
         facts = []
         
         try:
@@ -456,7 +574,7 @@ class LearningEngine:
                         })
         
         except Exception as e:
-            logger.error(f"Fact generation error: {e}")
+            logger.error("Fact generation error: %s", e)
         
         return facts
     
@@ -498,7 +616,7 @@ class LearningEngine:
                 ))
         
         except Exception as e:
-            logger.error(f"Insight generation error: {e}")
+            logger.error("Insight generation error: %s", e)
         
         return insights
 
@@ -3,36 +3,156 @@ Main Flask application for the AI User Learning System
 """
 
 import os
+import atexit
+import gzip
+import hmac
 import logging
+import queue
+import threading
 import time
 import json
-from datetime import datetime, timedelta
+import uuid
+from datetime import date, datetime, timedelta
 from functools import wraps
-from collections import defaultdict
-from flask import Flask, request, jsonify, render_template, Response, stream_template
+from logging.handlers import QueueHandler, QueueListener
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, render_template, Response, stream_template, g
 from flask_cors import CORS
 from werkzeug.exceptions import BadRequest, NotFound, InternalServerError
 
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import our modules
-from database import db_manager, UserRepository, InteractionRepository, LearnedFactRepository
+from database import get_db_manager, UserRepository, InteractionRepository, LearnedFactRepository
 from ai.learning_engine import LearningEngine
 from models import InteractionType, LearningConfidence
+from utils import LocalTTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def start_log_listener():
+    """Hand log records to a background thread through a queue, so request
+    threads never block on writing to stderr
+    
+    Called by the entry points (`python app.py` and gunicorn's post_fork
+    hook) rather than on import, so importing the app leaves logging alone.
+    Returns the listener; stop it to flush the queue on shutdown.
+    """
+    log_queue = queue.SimpleQueue()
+    log_listener = QueueListener(log_queue, *logging.root.handlers, respect_handler_level=True)
+    logging.root.handlers = [QueueHandler(log_queue)]
+    log_listener.start()
+    return log_listener
+
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider that serializes with orjson instead of the stdlib json module
+    
+    orjson writes datetimes as ISO 8601 strings natively, so handlers can
+    return datetime values as they are.
+    """
+    
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip of the default implementation
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.option), mimetype='application/json')
+
+
+class ISODateJSONProvider(DefaultJSONProvider):
+    """Stdlib JSON provider that writes datetimes as ISO 8601, matching orjson"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
 # Create Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Use orjson for request and response bodies when it is installed
+app.json = ORJSONProvider(app) if orjson else ISODateJSONProvider(app)
+
 # Webhook configuration
 WEBHOOK_API_KEY = os.getenv('WEBHOOK_API_KEY', 'dev-webhook-key-change-in-production')
+WEBHOOK_API_KEY_BYTES = WEBHOOK_API_KEY.encode()
+WEBHOOK_DEV_MODE = WEBHOOK_API_KEY == 'dev-webhook-key-change-in-production'
 RATE_LIMIT_WINDOW = 300  # 5 minutes
 RATE_LIMIT_MAX_REQUESTS = 100  # requests per window
 
-# Rate limiting storage (in production, use Redis)
-rate_limit_store = defaultdict(list)
+# Response compression
+COMPRESS_MIN_SIZE = 500  # bytes; smaller bodies are not worth compressing
+COMPRESS_LEVEL = 4
+
+# Shared Redis client when REDIS_URL is set, so rate limits and caches are
+# shared across worker processes; otherwise in-process stores are used
+REDIS_URL = os.getenv('REDIS_URL')
+redis_client = (
+    redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(REDIS_URL, max_connections=50))
+    if redis and REDIS_URL else None
+)
+
+# Rate limiting storage: per-client request timestamps, oldest first
+rate_limit_store = defaultdict(deque)
+rate_limit_lock = threading.Lock()
+RATE_LIMIT_SWEEP_INTERVAL = 1000  # requests between sweeps of idle clients
+rate_limit_requests_seen = 0
+
+# Concurrent SSE streams per client. Slots held by a process that died
+# without releasing them are forgotten after STREAM_SLOT_TTL in Redis.
+STREAM_MAX_ACTIVE = 5
+STREAM_SLOT_TTL = 3600  # seconds
+active_streams = defaultdict(int)
+active_streams_lock = threading.Lock()
+
+# User lookup cache (read-mostly fields only, never last_active)
+USER_CACHE_TTL = 60  # seconds
+USER_CACHE_MAX_SIZE = 10000
+user_cache = LocalTTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL)
+username_cache = LocalTTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL)  # usernames never change
+
+# Analytics responses, dropped whenever a user's interactions or facts change
+ANALYTICS_CACHE_TTL = 60  # seconds
+analytics_cache = LocalTTLCache(USER_CACHE_MAX_SIZE, ANALYTICS_CACHE_TTL)
+
+# Last recorded activity per user; last_active is written at most once per
+# interval instead of on every read, and with Redis once per interval across
+# all workers
+ACTIVITY_UPDATE_INTERVAL = timedelta(seconds=60)
+recent_activity = LocalTTLCache(USER_CACHE_MAX_SIZE, ACTIVITY_UPDATE_INTERVAL.total_seconds())
+
+# Per-user change counters that wake insight streams in this process; with
+# Redis, changes are also published so streams in other workers wake up
+user_update_versions = {}
+user_update_condition = threading.Condition()
+STREAM_RECHECK_INTERVAL = 30  # seconds; streams re-check even without a notification
+
+if WEBHOOK_DEV_MODE:
+    logger.warning("Using development webhook key - set WEBHOOK_API_KEY in production!")
 
 # Enable CORS for cross-origin requests
 CORS(app)
@@ -40,31 +160,54 @@ CORS(app)
 # Initialize learning engine
 learning_engine = LearningEngine()
 
+# Background workers for real-time learning, so interaction requests do not
+# wait for analysis and fact writes
+learning_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('LEARNING_WORKERS', '2')),
+    thread_name_prefix='learning'
+)
+
+# Confidence levels in ascending order, for minimum-confidence filters
+CONFIDENCE_RANKS = {level.value: rank for rank, level in enumerate(LearningConfidence)}
+
+# Users with a queued recent-interactions learning run; chat messages that
+# arrive before it starts coalesce into it
+pending_learning_users = set()
+pending_learning_lock = threading.Lock()
+LEARNING_PENDING_TTL = 300  # seconds; expiry of the shared Redis marker
+
+# Bulk uploads larger than one chunk are learned in the background, chunk
+# by chunk, with progress reported through /webhook/tasks/<task_id>
+BULK_LEARNING_CHUNK_SIZE = 500  # interactions
+TASK_STATUS_TTL = 3600  # seconds
+TASK_STATUS_MAX_SIZE = 1000
+task_statuses = LocalTTLCache(TASK_STATUS_MAX_SIZE, TASK_STATUS_TTL)
+
 
 # =============================================================================
 # AUTHENTICATION AND RATE LIMITING MIDDLEWARE
 # =============================================================================
 
+def _is_valid_webhook_key(key):
+    """Constant-time comparison of a presented key against the webhook API key"""
+    return bool(key) and hmac.compare_digest(key.encode(), WEBHOOK_API_KEY_BYTES)
+
+
 def webhook_auth_required(f):
     """Decorator for webhook authentication"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        api_key = request.headers.get('X-API-Key')
+        # Allow development mode without auth
+        if WEBHOOK_DEV_MODE:
+            return f(*args, **kwargs)
         
         # Check Bearer token
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            if token == WEBHOOK_API_KEY:
-                return f(*args, **kwargs)
-        
-        # Check API key header
-        if api_key == WEBHOOK_API_KEY:
+        auth_header = request.headers.get('Authorization')
+        if auth_header and auth_header.startswith('Bearer ') and _is_valid_webhook_key(auth_header[7:]):
             return f(*args, **kwargs)
         
-        # Allow development mode without auth
-        if WEBHOOK_API_KEY == 'dev-webhook-key-change-in-production':
-            logger.warning("Using development webhook key - set WEBHOOK_API_KEY in production!")
+        # Check API key header
+        if _is_valid_webhook_key(request.headers.get('X-API-Key')):
             return f(*args, **kwargs)
         
         return jsonify({'error': 'Authentication required'}), 401
@@ -72,29 +215,69 @@ def webhook_auth_required(f):
     return decorated_function
 
 
+def _is_rate_limited(client_id, limit, time_window):
+    """Record a request for the client and report whether it exceeds the limit"""
+    current_time = time.time()
+    
+    if redis_client is not None:
+        # Fixed window counter: one INCR + EXPIRE round trip per request
+        key = f"rate_limit:{client_id}:{int(current_time // time_window)}"
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, time_window)
+            request_count, _ = pipe.execute()
+            return request_count > limit
+        except redis.RedisError as e:
+            logger.error("Rate limit store error, using local limits: %s", e)
+    
+    global rate_limit_requests_seen
+    cutoff = current_time - time_window
+    
+    with rate_limit_lock:
+        client_requests = rate_limit_store[client_id]
+        
+        # Drop requests outside the window from the old end
+        while client_requests and client_requests[0] <= cutoff:
+            client_requests.popleft()
+        
+        # Periodically forget clients with no requests in the window
+        rate_limit_requests_seen += 1
+        if rate_limit_requests_seen % RATE_LIMIT_SWEEP_INTERVAL == 0:
+            idle_cutoff = current_time - max(time_window, RATE_LIMIT_WINDOW)
+            for idle_client in [key for key, times in rate_limit_store.items()
+                                if key != client_id and (not times or times[-1] <= idle_cutoff)]:
+                del rate_limit_store[idle_client]
+        
+        if len(client_requests) >= limit:
+            return True
+        
+        # Add current request
+        client_requests.append(current_time)
+        return False
+
+
+def _client_id():
+    """Identify the requesting client by address and API key"""
+    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+    api_key = request.headers.get('X-API-Key', 'anonymous')
+    return f"{client_ip}:{api_key}"
+
+
 def rate_limit(max_requests=None, window=None):
     """Rate limiting decorator"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # Get client identifier
-            client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-            api_key = request.headers.get('X-API-Key', 'anonymous')
-            client_id = f"{client_ip}:{api_key}"
+            client_id = _client_id()
             
             # Use provided limits or defaults
             limit = max_requests or RATE_LIMIT_MAX_REQUESTS
             time_window = window or RATE_LIMIT_WINDOW
             
-            current_time = time.time()
-            client_requests = rate_limit_store[client_id]
-            
-            # Clean old requests outside the window
-            client_requests[:] = [req_time for req_time in client_requests 
-                                if current_time - req_time < time_window]
-            
             # Check if limit exceeded
-            if len(client_requests) >= limit:
+            if _is_rate_limited(client_id, limit, time_window):
                 return jsonify({
                     'error': 'Rate limit exceeded',
                     'limit': limit,
@@ -102,15 +285,428 @@ def rate_limit(max_requests=None, window=None):
                     'retry_after': time_window
                 }), 429
             
-            # Add current request
-            client_requests.append(current_time)
-            
             return f(*args, **kwargs)
         
         return decorated_function
     return decorator
 
 
+def _acquire_stream_slot(client_id, limit):
+    """Claim one of the client's concurrent stream slots; returns a release callback, or None if all are taken"""
+    if redis_client is not None:
+        # Sorted set of open stream tokens scored by start time
+        key = f"streams:{client_id}"
+        token = uuid.uuid4().hex
+        now = time.time()
+        try:
+            pipe = redis_client.pipeline()
+            pipe.zremrangebyscore(key, '-inf', now - STREAM_SLOT_TTL)
+            pipe.zadd(key, {token: now})
+            pipe.zcard(key)
+            pipe.expire(key, STREAM_SLOT_TTL)
+            open_streams = pipe.execute()[2]
+            
+            def release():
+                try:
+                    redis_client.zrem(key, token)
+                except redis.RedisError as e:
+                    logger.error("Stream limit store error: %s", e)
+            
+            if open_streams > limit:
+                release()
+                return None
+            return release
+        except redis.RedisError as e:
+            logger.error("Stream limit store error, using local limits: %s", e)
+    
+    with active_streams_lock:
+        if active_streams[client_id] >= limit:
+            return None
+        active_streams[client_id] += 1
+    
+    def release():
+        with active_streams_lock:
+            active_streams[client_id] -= 1
+            if not active_streams[client_id]:
+                del active_streams[client_id]
+    
+    return release
+
+
+def stream_limit(max_streams=None):
+    """Decorator bounding how many SSE streams a client may hold open at once"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limit = max_streams or STREAM_MAX_ACTIVE
+            release = _acquire_stream_slot(_client_id(), limit)
+            if release is None:
+                return jsonify({
+                    'error': 'Too many open streams',
+                    'limit': limit
+                }), 429
+            
+            try:
+                response = f(*args, **kwargs)
+            except Exception:
+                release()
+                raise
+            
+            # Free the slot when the client disconnects or the stream ends
+            response.call_on_close(release)
+            return response
+        
+        return decorated_function
+    return decorator
+
+
+# =============================================================================
+# REQUEST-SCOPED DATABASE SESSION
+# =============================================================================
+
+def get_request_session():
+    """Get the database session shared by everything handling the current request"""
+    if 'db_session' not in g:
+        g.db_session = get_db_manager().SessionLocal()
+    return g.db_session
+
+
+def run_after_commit(func, *args):
+    """Schedule a call for after the request's session has been committed"""
+    g.setdefault('after_commit', []).append((func, args))
+
+
+@app.after_request
+def commit_request_session(response):
+    """Commit the request's session once, or roll it back for error responses"""
+    session = g.get('db_session')
+    if session is not None:
+        if response.status_code < 400:
+            session.commit()
+            for func, args in g.pop('after_commit', ()):
+                func(*args)
+        else:
+            session.rollback()
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Gzip JSON responses for clients that accept it"""
+    if response.mimetype != 'application/json' or response.direct_passthrough:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    if 'Content-Encoding' in response.headers or not request.accept_encodings['gzip']:
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+@app.after_request
+def conditional_response(response):
+    """Tag GET JSON responses with an ETag and answer a matching
+    If-None-Match with 304 Not Modified
+    
+    Registered after compress_response so it runs first and hashes the
+    uncompressed body; the tag is weak since the body may then be gzipped.
+    """
+    if (request.method != 'GET' or response.status_code != 200
+            or response.mimetype != 'application/json' or response.direct_passthrough):
+        return response
+    
+    response.add_etag(weak=True)
+    return response.make_conditional(request)
+
+
+@app.teardown_request
+def close_request_session(error=None):
+    """Return the request's connection to the pool"""
+    session = g.pop('db_session', None)
+    if session is not None:
+        session.close()
+
+
+# =============================================================================
+# USER CACHE
+# =============================================================================
+
+def _user_cache_key(user_id):
+    return f"user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """Get a cached user payload, or None on a miss"""
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(_user_cache_key(user_id))
+            return app.json.loads(cached) if cached else None
+        except redis.RedisError as e:
+            logger.error("User cache error: %s", e)
+    
+    return user_cache.get(user_id)
+
+
+def cache_user(user_id, payload):
+    """Cache a user payload for USER_CACHE_TTL seconds"""
+    if redis_client is not None:
+        try:
+            redis_client.setex(_user_cache_key(user_id), USER_CACHE_TTL, app.json.dumps(payload))
+            return
+        except redis.RedisError as e:
+            logger.error("User cache error: %s", e)
+    
+    user_cache.set(user_id, payload)
+
+
+def invalidate_user_cache(user_id):
+    """Drop a user's cached payload after it changes"""
+    user_cache.pop(user_id)
+    if redis_client is not None:
+        try:
+            redis_client.delete(_user_cache_key(user_id))
+        except redis.RedisError as e:
+            logger.error("User cache error: %s", e)
+
+
+def _username_cache_key(username):
+    return f"user:name:{username}"
+
+
+def get_user_id_by_username(session, username):
+    """Resolve a username to a user ID, or None if there is no such user, caching hits"""
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(_username_cache_key(username))
+            if cached:
+                return int(cached)
+        except redis.RedisError as e:
+            logger.error("User cache error: %s", e)
+    
+    user_id = username_cache.get(username)
+    if user_id is not None:
+        return user_id
+    
+    user_id = UserRepository(session).get_user_id_by_username(username)
+    if user_id is not None:
+        cache_user_id(username, user_id)
+    return user_id
+
+
+def cache_user_id(username, user_id):
+    """Cache a username's user ID for USER_CACHE_TTL seconds"""
+    if redis_client is not None:
+        try:
+            redis_client.setex(_username_cache_key(username), USER_CACHE_TTL, user_id)
+            return
+        except redis.RedisError as e:
+            logger.error("User cache error: %s", e)
+    
+    username_cache.set(username, user_id)
+
+
+def _activity_key(user_id):
+    return f"user:{user_id}:active"
+
+
+def record_user_activity(user_repo, user_id):
+    """Update a user's last_active unless it was written within
+    ACTIVITY_UPDATE_INTERVAL; returns the recorded time, or None if there is
+    no such user"""
+    last_active = recent_activity.get(user_id)
+    now = datetime.utcnow()
+    if last_active is not None and now - last_active < ACTIVITY_UPDATE_INTERVAL:
+        return last_active
+    
+    if redis_client is not None:
+        try:
+            # Only the worker that claims the key writes to the database
+            interval = int(ACTIVITY_UPDATE_INTERVAL.total_seconds())
+            if not redis_client.set(_activity_key(user_id), now.isoformat(), ex=interval, nx=True):
+                recorded = redis_client.get(_activity_key(user_id))
+                if recorded:
+                    last_active = datetime.fromisoformat(recorded.decode())
+                    recent_activity.set(user_id, last_active)
+                    return last_active
+        except redis.RedisError as e:
+            logger.error("User activity error: %s", e)
+    
+    last_active = user_repo.update_user_activity(user_id)
+    if last_active is None:
+        if redis_client is not None:
+            try:
+                redis_client.delete(_activity_key(user_id))
+            except redis.RedisError as e:
+                logger.error("User activity error: %s", e)
+        return None
+    
+    recent_activity.set(user_id, last_active)
+    return last_active
+
+
+def _analytics_cache_key(user_id):
+    return f"analytics:{user_id}"
+
+
+def get_cached_analytics(user_id):
+    """Get a cached analytics payload, or None on a miss"""
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(_analytics_cache_key(user_id))
+            return app.json.loads(cached) if cached else None
+        except redis.RedisError as e:
+            logger.error("Analytics cache error: %s", e)
+    
+    return analytics_cache.get(user_id)
+
+
+def cache_analytics(user_id, payload):
+    """Cache an analytics payload for ANALYTICS_CACHE_TTL seconds"""
+    if redis_client is not None:
+        try:
+            redis_client.setex(_analytics_cache_key(user_id), ANALYTICS_CACHE_TTL, app.json.dumps(payload))
+            return
+        except redis.RedisError as e:
+            logger.error("Analytics cache error: %s", e)
+    
+    analytics_cache.set(user_id, payload)
+
+
+def invalidate_analytics_cache(user_id):
+    """Drop a user's cached analytics after their interactions or facts change"""
+    analytics_cache.pop(user_id)
+    if redis_client is not None:
+        try:
+            redis_client.delete(_analytics_cache_key(user_id))
+        except redis.RedisError as e:
+            logger.error("Analytics cache error: %s", e)
+
+
+# =============================================================================
+# USER UPDATE NOTIFICATIONS
+# =============================================================================
+
+def _user_updates_channel(user_id):
+    return f"user:{user_id}:updates"
+
+
+def publish_user_update(user_id, update_type):
+    """Wake insight streams for a user after their interactions or facts change"""
+    invalidate_analytics_cache(user_id)
+    
+    with user_update_condition:
+        user_update_versions[user_id] = user_update_versions.get(user_id, 0) + 1
+        user_update_condition.notify_all()
+    
+    if redis_client is not None:
+        try:
+            redis_client.publish(_user_updates_channel(user_id), app.json.dumps({'type': update_type}))
+        except redis.RedisError as e:
+            logger.error("Update notification error: %s", e)
+
+
+def wait_for_user_updates(user_id, timeout=STREAM_RECHECK_INTERVAL):
+    """
+    Generator that resumes whenever a user's data changes, or after `timeout`
+    seconds without a notification. The first next() subscribes and returns
+    immediately, so read the current state only after it.
+    """
+    pubsub = None
+    if redis_client is not None:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(_user_updates_channel(user_id))
+        except redis.RedisError as e:
+            logger.error("Update subscription error: %s", e)
+            pubsub = None
+    
+    try:
+        seen = user_update_versions.get(user_id, 0)
+        yield
+        while True:
+            if pubsub is not None:
+                try:
+                    pubsub.get_message(timeout=timeout)
+                    yield
+                    continue
+                except redis.RedisError as e:
+                    logger.error("Update subscription error: %s", e)
+                    pubsub.close()
+                    pubsub = None
+            
+            with user_update_condition:
+                user_update_condition.wait_for(
+                    lambda: user_update_versions.get(user_id, 0) != seen, timeout
+                )
+                seen = user_update_versions.get(user_id, 0)
+            yield
+    finally:
+        if pubsub is not None:
+            pubsub.close()
+
+
+# =============================================================================
+# BACKGROUND TASK STATUS
+# =============================================================================
+
+def _task_status_key(task_id):
+    return f"learning_task:{task_id}"
+
+
+def set_task_status(task_id, status):
+    """Record a background task's progress for TASK_STATUS_TTL seconds"""
+    if redis_client is not None:
+        try:
+            redis_client.setex(_task_status_key(task_id), TASK_STATUS_TTL, app.json.dumps(status))
+            return
+        except redis.RedisError as e:
+            logger.error("Task status error: %s", e)
+    
+    task_statuses.set(task_id, dict(status))
+
+
+def get_task_status(task_id):
+    """Get a background task's progress, or None if it is unknown or expired"""
+    if redis_client is not None:
+        try:
+            status = redis_client.get(_task_status_key(task_id))
+            if status:
+                return app.json.loads(status)
+        except redis.RedisError as e:
+            logger.error("Task status error: %s", e)
+    
+    return task_statuses.get(task_id)
+
+
+# =============================================================================
+# RESPONSE HELPERS
+# =============================================================================
+
+def serialize_rows(rows):
+    """Turn result rows into response dicts; the JSON provider formats datetimes"""
+    if not rows:
+        return []
+    
+    # Zipping with the column names fetched once is much cheaper than
+    # Row._asdict(), which resolves every key through the result keymap
+    fields = rows[0]._fields
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def sse_event(payload):
+    """Format a payload as a Server-Sent Events message"""
+    if orjson:
+        # Encode straight to bytes instead of building and re-encoding a str
+        return b"data: " + orjson.dumps(payload, option=ORJSONProvider.option) + b"\n\n"
+    return f"data: {json.dumps(payload)}\n\n"
+
+
 @app.errorhandler(400)
 def bad_request(error):
     return jsonify({'error': 'Bad request', 'message': str(error)}), 400
@@ -155,78 +751,55 @@ def webhook_chat_message():
         session_id = data.get('session_id')
         metadata = data.get('metadata', {})
         
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            interaction_repo = InteractionRepository(session)
-            
-            # Find or create user
-            user = user_repo.get_user_by_username(user_identifier)
-            if not user:
-                user = user_repo.create_user(
-                    username=user_identifier,
-                    email=f"{user_identifier}@chatbot.local"
-                )
-                session.commit()
-            
-            # Log user message
-            user_interaction = interaction_repo.create_interaction(
-                user_id=user.id,
-                content=user_message,
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        interaction_repo = InteractionRepository(session)
+        
+        # Find or create user
+        user_id = get_user_id_by_username(session, user_identifier)
+        if user_id is None:
+            user_id = user_repo.create_user(
+                username=user_identifier,
+                email=f"{user_identifier}@chatbot.local"
+            ).id
+        
+        # Log user message
+        user_interaction = interaction_repo.create_interaction(
+            user_id=user_id,
+            content=user_message,
+            interaction_type=InteractionType.MESSAGE.value,
+            context=metadata,
+            session_id=session_id
+        )
+        
+        # Log bot response if provided
+        if bot_response:
+            bot_interaction = interaction_repo.create_interaction(
+                user_id=user_id,
+                content=bot_response,
                 interaction_type=InteractionType.MESSAGE.value,
-                metadata=metadata,
+                context=metadata,
                 session_id=session_id
             )
-            
-            # Log bot response if provided
-            if bot_response:
-                bot_interaction = interaction_repo.create_interaction(
-                    user_id=user.id,
-                    content=bot_response,
-                    interaction_type=InteractionType.MESSAGE.value,
-                    metadata=metadata,
-                    session_id=session_id
-                )
-            
-            session.commit()
-            
-            # Trigger AI learning
-            try:
-                recent_interactions = interaction_repo.get_user_interactions(
-                    user.id, limit=20
-                )
-                learning_result = learning_engine.process_user_interactions(
-                    user.id, recent_interactions
-                )
-                
-                # Store any new facts
-                fact_repo = LearnedFactRepository(session)
-                for fact_data in learning_result.new_facts:
-                    fact_repo.create_fact(
-                        user_id=user.id,
-                        category=fact_data.get('category'),
-                        fact_type=fact_data.get('fact_type'),
-                        fact_key=fact_data.get('fact_key'),
-                        fact_value=fact_data.get('fact_value'),
-                        confidence_level=fact_data.get('confidence_level'),
-                        evidence_count=fact_data.get('evidence_count', 1),
-                        learning_method=fact_data.get('learning_method')
-                    )
-                session.commit()
-                
-            except Exception as e:
-                logger.error(f"Learning error: {e}")
-                # Continue even if learning fails
-            
-            return jsonify({
-                'success': True,
-                'user_id': user.id,
-                'interaction_id': user_interaction.id,
-                'learned_facts_count': len(learning_result.new_facts) if 'learning_result' in locals() else 0,
-                'message': 'Interaction logged and processed'
-            })
-            
+        
+        session.flush()  # Assign IDs; the request commits once at the end
+        
+        run_after_commit(publish_user_update, user_id, 'interaction')
+        
+        # Queue AI learning on the recent conversation once the interactions
+        # are committed, instead of running it inside the request
+        run_after_commit(schedule_recent_learning, user_id)
+        
+        return jsonify({
+            'success': True,
+            'user_id': user_id,
+            'interaction_id': user_interaction.id,
+            'learning_queued': True,
+            'message': 'Interaction logged; learning queued'
+        }), 202
+        
     except Exception as e:
-        logger.error(f"Webhook error: {e}")
+        logger.error("Webhook error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -248,80 +821,79 @@ def webhook_get_insights(user_identifier):
         limit = int(request.args.get('limit', 10))
         min_confidence = request.args.get('confidence', 'low')
         
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            fact_repo = LearnedFactRepository(session)
-            interaction_repo = InteractionRepository(session)
-            
-            # Find user
-            user = user_repo.get_user_by_username(user_identifier)
-            if not user:
-                return jsonify({
-                    'error': f'User {user_identifier} not found'
-                }), 404
-            
-            # Get user facts
-            all_facts = fact_repo.get_user_facts(
-                user.id,
-                category=categories
-            )
-            
-            # Apply confidence filtering
-            if min_confidence != 'low':
-                confidence_map = {'medium': 0.5, 'high': 0.8}
-                min_conf_value = confidence_map.get(min_confidence, 0.0)
-                all_facts = [f for f in all_facts if f.confidence_level >= min_conf_value]
-            
-            # Apply limit
-            facts = all_facts[:limit] if limit else all_facts
-            
-            # Get recent interactions for context
-            recent_interactions = interaction_repo.get_user_interactions(
-                user.id, limit=5
-            )
-            
-            # Get user analytics - compute basic stats
-            total_interactions = len(interaction_repo.get_user_interactions(user.id, limit=1000))
-            analytics = {
-                'total_interactions': total_interactions,
-                'facts_learned': len(facts)
-            }
-            
+        session = get_request_session()
+        fact_repo = LearnedFactRepository(session)
+        interaction_repo = InteractionRepository(session)
+        
+        # Find user
+        user_id = get_user_id_by_username(session, user_identifier)
+        if user_id is None:
             return jsonify({
-                'user_id': user.id,
-                'username': user.username,
-                'facts': [
-                    {
-                        'category': fact.category,
-                        'type': fact.fact_type,
-                        'key': fact.fact_key,
-                        'value': fact.fact_value,
-                        'confidence': fact.confidence_level,
-                        'evidence_count': fact.evidence_count,
-                        'last_updated': fact.updated_at.isoformat() if fact.updated_at else None
-                    }
-                    for fact in facts
-                ],
-                'recent_interactions': [
-                    {
-                        'content': interaction.content,
-                        'type': interaction.interaction_type,
-                        'sentiment': interaction.sentiment,
-                        'topics': interaction.topics,
-                        'timestamp': interaction.timestamp.isoformat()
-                    }
-                    for interaction in recent_interactions
-                ],
-                'analytics': analytics,
-                'suggestions': [
-                    f"User shows interest in {fact.fact_value}" 
-                    for fact in facts 
-                    if fact.category == 'interests'
-                ][:3]
-            })
-            
+                'error': f'User {user_identifier} not found'
+            }), 404
+        
+        # Confidence filtering and the limit run in the query, so a user
+        # with many facts never has them all loaded
+        confidence_levels = None
+        min_rank = CONFIDENCE_RANKS.get(min_confidence, 0)
+        if min_rank > 0:
+            confidence_levels = [level for level, rank in CONFIDENCE_RANKS.items() if rank >= min_rank]
+        
+        # Get user facts
+        facts = fact_repo.get_user_fact_rows(
+            user_id,
+            category=categories,
+            limit=limit or None,
+            confidence_levels=confidence_levels
+        )
+        
+        # Get recent interactions for context
+        recent_interactions = interaction_repo.get_user_interaction_rows(
+            user_id, limit=5
+        )
+        
+        # Get user analytics - compute basic stats
+        total_interactions, _ = interaction_repo.get_interaction_stats(user_id)
+        analytics = {
+            'total_interactions': total_interactions,
+            'facts_learned': len(facts)
+        }
+        
+        return jsonify({
+            'user_id': user_id,
+            'username': user_identifier,
+            'facts': [
+                {
+                    'category': fact.category,
+                    'type': fact.fact_type,
+                    'key': fact.fact_key,
+                    'value': fact.fact_value,
+                    'confidence': fact.confidence_level,
+                    'evidence_count': fact.evidence_count,
+                    'last_updated': fact.last_updated
+                }
+                for fact in facts
+            ],
+            'recent_interactions': [
+                {
+                    'content': interaction.content,
+                    'type': interaction.type,
+                    'sentiment': interaction.sentiment,
+                    'topics': interaction.topics,
+                    'timestamp': interaction.timestamp
+                }
+                for interaction in recent_interactions
+            ],
+            'analytics': analytics,
+            'suggestions': [
+                f"User shows interest in {fact.fact_value}" 
+                for fact in facts 
+                if fact.category == 'interests'
+            ][:3]
+        })
+        
     except Exception as e:
-        logger.error(f"Insights webhook error: {e}")
+        logger.error("Insights webhook error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -352,70 +924,142 @@ def webhook_bulk_interactions():
         user_identifier = data['user_id']
         interactions_data = data['interactions']
         
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            interaction_repo = InteractionRepository(session)
-            
-            # Find or create user
-            user = user_repo.get_user_by_username(user_identifier)
-            if not user:
-                user = user_repo.create_user(
-                    username=user_identifier,
-                    email=f"{user_identifier}@chatbot.local"
-                )
-                session.commit()
-            
-            # Create interactions
-            created_interactions = []
-            for interaction_data in interactions_data:
-                interaction = interaction_repo.create_interaction(
-                    user_id=user.id,
-                    content=interaction_data['message'],
-                    interaction_type=InteractionType.MESSAGE.value,
-                    metadata=interaction_data.get('metadata', {}),
-                    session_id=interaction_data.get('session_id')
-                )
-                created_interactions.append(interaction)
-            
-            session.commit()
-            
-            # Trigger learning on all interactions
-            all_interactions = interaction_repo.get_user_interactions(user.id)
-            learning_result = learning_engine.process_user_interactions(
-                user.id, all_interactions
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        interaction_repo = InteractionRepository(session)
+        
+        # Find or create user
+        user_id = get_user_id_by_username(session, user_identifier)
+        if user_id is None:
+            user_id = user_repo.create_user(
+                username=user_identifier,
+                email=f"{user_identifier}@chatbot.local"
+            ).id
+        
+        # Create interactions in one batch
+        created_interactions = interaction_repo.bulk_create_interactions([
+            {
+                'user_id': user_id,
+                'content': interaction_data['message'],
+                'interaction_type': InteractionType.MESSAGE.value,
+                'context': interaction_data.get('metadata', {}),
+                'session_id': interaction_data.get('session_id')
+            }
+            for interaction_data in interactions_data
+        ])
+        
+        run_after_commit(publish_user_update, user_id, 'interaction')
+        
+        # Large uploads are learned in the background so the request does
+        # not block on the analysis
+        if len(created_interactions) > BULK_LEARNING_CHUNK_SIZE:
+            task_id = uuid.uuid4().hex
+            run_after_commit(
+                queue_bulk_learning, task_id, user_id,
+                [interaction.id for interaction in created_interactions]
             )
             
-            # Store new facts
-            fact_repo = LearnedFactRepository(session)
-            for fact_data in learning_result.new_facts:
-                fact_repo.create_fact(
-                    user_id=user.id,
-                    category=fact_data.get('category'),
-                    fact_type=fact_data.get('fact_type'),
-                    fact_key=fact_data.get('fact_key'),
-                    fact_value=fact_data.get('fact_value'),
-                    confidence_level=fact_data.get('confidence_level'),
-                    evidence_count=fact_data.get('evidence_count', 1),
-                    learning_method=fact_data.get('learning_method')
-                )
-            session.commit()
-            
             return jsonify({
                 'success': True,
-                'user_id': user.id,
+                'user_id': user_id,
                 'interactions_created': len(created_interactions),
-                'facts_learned': len(learning_result.new_facts),
-                'processing_time_ms': learning_result.processing_time_ms
-            })
-            
+                'facts_learned': None,  # Reported by the task once learning finishes
+                'task_id': task_id,
+                'status_url': f"/webhook/tasks/{task_id}"
+            }), 202
+        
+        # Learn from the uploaded batch; facts from earlier interactions are
+        # already stored and gain evidence when the upsert merges with them
+        learning_result = learning_engine.process_user_interactions(
+            user_id, created_interactions
+        )
+        
+        # Store new facts
+        fact_repo = LearnedFactRepository(session)
+        fact_repo.bulk_upsert_facts(learning_result.new_facts)
+        
+        # Keep the manual learn endpoint from counting this batch again
+        interaction_repo.mark_interactions_processed([interaction.id for interaction in created_interactions])
+        
+        return jsonify({
+            'success': True,
+            'user_id': user_id,
+            'interactions_created': len(created_interactions),
+            'facts_learned': len(learning_result.new_facts),
+            'processing_time_ms': learning_result.processing_time_ms
+        })
+        
     except Exception as e:
-        logger.error(f"Bulk webhook error: {e}")
+        logger.error("Bulk webhook error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
+def queue_bulk_learning(task_id, user_id, interaction_ids):
+    """Report a bulk upload's task as queued and submit it; only called once
+    the upload is committed, so a failed upload never leaves a queued task"""
+    set_task_status(task_id, {'task_id': task_id, 'status': 'queued'})
+    learning_executor.submit(learn_from_bulk_upload, task_id, user_id, interaction_ids)
+
+
+def learn_from_bulk_upload(task_id, user_id, interaction_ids):
+    """Run the learning engine over uploaded interactions one chunk at a time (background task)"""
+    chunks = [interaction_ids[start:start + BULK_LEARNING_CHUNK_SIZE]
+              for start in range(0, len(interaction_ids), BULK_LEARNING_CHUNK_SIZE)]
+    status = {
+        'task_id': task_id,
+        'status': 'running',
+        'chunks_total': len(chunks),
+        'chunks_done': 0,
+        'facts_learned': 0
+    }
+    set_task_status(task_id, status)
+    
+    try:
+        # Chunks run in order, each in its own transaction: parallel chunks
+        # of one user would contend for the same fact rows
+        for chunk in chunks:
+            with get_db_manager().get_session() as session:
+                interaction_repo = InteractionRepository(session)
+                fact_repo = LearnedFactRepository(session)
+                
+                # A concurrent /learn call may already have claimed some of them
+                interactions = interaction_repo.claim_unprocessed_interactions(user_id, chunk)
+                new_facts = []
+                if interactions:
+                    new_facts = learning_engine.process_user_interactions(user_id, interactions).new_facts
+                    fact_repo.bulk_upsert_facts(new_facts)
+            
+            if new_facts:
+                publish_user_update(user_id, 'fact')
+            
+            status['chunks_done'] += 1
+            status['facts_learned'] += len(new_facts)
+            set_task_status(task_id, status)
+        
+        status['status'] = 'completed'
+    
+    except Exception as e:
+        logger.error("Bulk learning error: %s", e)
+        status['status'] = 'failed'
+        status['error'] = str(e)
+    
+    set_task_status(task_id, status)
+
+
+@app.route('/webhook/tasks/<task_id>', methods=['GET'])
+@webhook_auth_required
+def webhook_task_status(task_id):
+    """Report the progress of a background learning task"""
+    status = get_task_status(task_id)
+    if status is None:
+        return jsonify({'error': f'Task {task_id} not found'}), 404
+    return jsonify(status)
+
+
 @app.route('/webhook/stream/insights/<user_identifier>')
 @webhook_auth_required
 @rate_limit(max_requests=10, window=300)  # 10 stream connections per 5 minutes
+@stream_limit()  # at most STREAM_MAX_ACTIVE open at once
 def stream_user_insights(user_identifier):
     """
     Server-Sent Events stream for real-time user insights
@@ -427,31 +1071,43 @@ def stream_user_insights(user_identifier):
         """Generate real-time insights stream"""
         last_fact_count = 0
         last_interaction_count = 0
+        last_fact_id = None
+        last_interaction_id = None
+        user_id = None
+        updates = None
         
-        while True:
-            try:
-                with db_manager.get_session() as session:
-                    user_repo = UserRepository(session)
-                    fact_repo = LearnedFactRepository(session)
-                    interaction_repo = InteractionRepository(session)
-                    
-                    # Find user
-                    user = user_repo.get_user_by_username(user_identifier)
-                    if not user:
-                        yield f"data: {json.dumps({'error': 'User not found'})}\n\n"
-                        break
-                    
-                    # Get current counts
-                    current_facts = fact_repo.get_user_facts(user.id, limit=100)
-                    current_interactions = interaction_repo.get_user_interactions(user.id, limit=1)
+        try:
+            with get_db_manager().get_session() as session:
+                fact_repo = LearnedFactRepository(session)
+                interaction_repo = InteractionRepository(session)
+                
+                while True:
+                    # Find user once; later checks only need the ID
+                    if user_id is None:
+                        user_id = get_user_id_by_username(session, user_identifier)
+                        if user_id is None:
+                            yield sse_event({'error': 'User not found'})
+                            break
+                        
+                        # Subscribe before reading, so no change is missed
+                        updates = wait_for_user_updates(user_id)
+                        next(updates)
                     
-                    fact_count = len(current_facts)
-                    interaction_count = len(current_interactions)
+                    # Get current counts; interactions are only recounted
+                    # when the newest interaction ID has moved
+                    fact_count, latest_fact_id = fact_repo.get_fact_stats(user_id)
+                    interaction_count = last_interaction_count
+                    latest_interaction_id = interaction_repo.get_latest_interaction_id(user_id)
+                    if latest_interaction_id != last_interaction_id:
+                        interaction_count, _ = interaction_repo.get_interaction_stats(user_id)
+                        last_interaction_id = latest_interaction_id
                     
                     # Check if there are updates
-                    if fact_count != last_fact_count or interaction_count != last_interaction_count:
-                        # Get latest insights
-                        recent_facts = current_facts[:5]  # Latest 5 facts
+                    update_data = None
+                    if (fact_count != last_fact_count or latest_fact_id != last_fact_id
+                            or interaction_count != last_interaction_count):
+                        # Get latest insights; facts are only read on a change
+                        recent_facts = fact_repo.get_user_fact_rows(user_id, limit=5)
                         analytics = {
                             'total_interactions': interaction_count,
                             'facts_learned': fact_count
@@ -459,8 +1115,8 @@ def stream_user_insights(user_identifier):
                         
                         update_data = {
                             'timestamp': datetime.utcnow().isoformat(),
-                            'user_id': user.id,
-                            'username': user.username,
+                            'user_id': user_id,
+                            'username': user_identifier,
                             'updates': {
                                 'new_facts': fact_count - last_fact_count,
                                 'new_interactions': interaction_count - last_interaction_count
@@ -470,25 +1126,34 @@ def stream_user_insights(user_identifier):
                                     'category': fact.category,
                                     'value': fact.fact_value,
                                     'confidence': fact.confidence_level,
-                                    'created_at': fact.created_at.isoformat() if fact.created_at else None
+                                    'created_at': fact.first_observed.isoformat() if fact.first_observed else None
                                 }
                                 for fact in recent_facts
                             ],
                             'analytics': analytics
                         }
                         
-                        yield f"data: {json.dumps(update_data)}\n\n"
-                        
                         last_fact_count = fact_count
+                        last_fact_id = latest_fact_id
                         last_interaction_count = interaction_count
                     
-                    # Wait before next check
-                    time.sleep(2)
+                    # End the read transaction, so the connection goes back to
+                    # the pool while streaming and waiting
+                    session.rollback()
                     
-            except Exception as e:
-                logger.error(f"Stream error: {e}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
-                break
+                    if update_data:
+                        yield sse_event(update_data)
+                    
+                    # Wait for the user's data to change instead of polling
+                    # the database
+                    next(updates)
+                
+        except Exception as e:
+            logger.error("Stream error: %s", e)
+            yield sse_event({'error': str(e)})
+        finally:
+            if updates is not None:
+                updates.close()
     
     return Response(
         generate_insights(),
@@ -514,69 +1179,61 @@ def stream_learning_process(user_identifier):
     def generate_learning_updates():
         """Generate real-time learning process updates"""
         try:
-            with db_manager.get_session() as session:
-                user_repo = UserRepository(session)
+            with get_db_manager().get_session() as session:
                 interaction_repo = InteractionRepository(session)
                 
                 # Find user
-                user = user_repo.get_user_by_username(user_identifier)
-                if not user:
-                    yield f"data: {json.dumps({'error': 'User not found'})}\n\n"
+                user_id = get_user_id_by_username(session, user_identifier)
+                if user_id is None:
+                    yield sse_event({'error': 'User not found'})
                     return
                 
                 # Start learning process
-                yield f"data: {json.dumps({'status': 'starting', 'message': 'Initializing learning process...'})}\n\n"
+                yield sse_event({'status': 'starting', 'message': 'Initializing learning process...'})
                 
-                # Get user interactions
-                interactions = interaction_repo.get_user_interactions(user.id)
+                # Claim the interactions not learned from yet; reopening the
+                # stream must not add evidence for the same interactions again
+                interactions = interaction_repo.claim_unprocessed_interactions(user_id)
                 
-                yield f"data: {json.dumps({'status': 'analyzing', 'message': f'Analyzing {len(interactions)} interactions...'})}\n\n"
+                yield sse_event({'status': 'analyzing', 'message': f'Analyzing {len(interactions)} interactions...'})
                 
                 # Process interactions with the learning engine
-                learning_result = learning_engine.process_user_interactions(user.id, interactions)
+                learning_result = learning_engine.process_user_interactions(user_id, interactions)
                 
-                yield f"data: {json.dumps({'status': 'learning', 'message': f'Extracted {len(learning_result.new_facts)} new insights...'})}\n\n"
+                yield sse_event({'status': 'learning', 'message': f'Extracted {len(learning_result.new_facts)} new insights...'})
                 
                 # Store new facts
+                stored_facts = []
                 if learning_result.new_facts:
                     fact_repo = LearnedFactRepository(session)
-                    stored_facts = []
-                    
-                    for i, fact_data in enumerate(learning_result.new_facts):
-                        fact = fact_repo.create_fact(
-                            user_id=user.id,
-                            category=fact_data.get('category'),
-                            fact_type=fact_data.get('fact_type'),
-                            fact_key=fact_data.get('fact_key'),
-                            fact_value=fact_data.get('fact_value'),
-                            confidence_level=fact_data.get('confidence_level'),
-                            evidence_count=fact_data.get('evidence_count', 1),
-                            learning_method=fact_data.get('learning_method')
-                        )
-                        stored_facts.append(fact)
-                        
-                        # Stream each fact as it's stored
-                        yield f"data: {json.dumps({'status': 'storing', 'message': f'Stored fact: {fact.fact_value}', 'fact': {'category': fact.category, 'value': fact.fact_value, 'confidence': fact.confidence_level}})}\n\n"
-                    
-                    session.commit()
-                
-                # Final summary
-                final_result = {
-                    'status': 'completed',
-                    'message': 'Learning process completed successfully',
-                    'summary': {
-                        'interactions_processed': learning_result.processing_time_ms,
-                        'facts_learned': len(learning_result.new_facts),
-                        'processing_time_ms': learning_result.processing_time_ms,
-                        'errors': learning_result.errors
-                    }
+                    stored_facts = fact_repo.bulk_upsert_facts(learning_result.new_facts)
+            
+            # The session commits once on exit, before the stored facts are
+            # reported, so no write transaction stays open while streaming
+            if stored_facts:
+                publish_user_update(user_id, 'fact')
+            
+            for fact in stored_facts:
+                # Stream each stored fact
+                yield sse_event({'status': 'storing', 'message': f'Stored fact: {fact.fact_value}', 'fact': {'category': fact.category, 'value': fact.fact_value, 'confidence': fact.confidence_level}})
+            
+            # Final summary
+            final_result = {
+                'status': 'completed',
+                'message': 'Learning process completed successfully',
+                'summary': {
+                    'interactions_processed': len(interactions),
+                    'facts_learned': len(learning_result.new_facts),
+                    'processing_time_ms': learning_result.processing_time_ms,
+                    'errors': learning_result.errors
                 }
-                
-                yield f"data: {json.dumps(final_result)}\n\n"
-                
+            }
+            
+            yield sse_event(final_result)
+            
         except Exception as e:
-            logger.error(f"Learning stream error: {e}")
-            yield f"data: {json.dumps({'status': 'error', 'message': str(e)})}\n\n"
+            logger.error("Learning stream error: %s", e)
+            yield sse_event({'status': 'error', 'message': str(e)})
     
     return Response(
         generate_learning_updates(),
@@ -602,14 +1259,14 @@ def internal_error(error):
 def health_check():
     """Health check endpoint"""
     try:
-        db_healthy = db_manager.health_check()
+        db_healthy = get_db_manager().health_check()
         return jsonify({
             'status': 'healthy' if db_healthy else 'unhealthy',
             'database': 'connected' if db_healthy else 'disconnected',
             'timestamp': datetime.utcnow().isoformat()
         }), 200 if db_healthy else 503
     except Exception as e:
-        logger.error(f"Health check error: {e}")
+        logger.error("Health check error: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -622,31 +1279,31 @@ def create_user():
         if not data or 'username' not in data:
             raise BadRequest('Username is required')
         
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            
-            # Check if user already exists
-            existing_user = user_repo.get_user_by_username(data['username'])
-            if existing_user:
-                return jsonify({'error': 'User already exists'}), 409
-            
-            # Create new user
-            user = user_repo.create_user(
-                username=data['username'],
-                email=data.get('email'),
-                data_sharing_consent=data.get('data_sharing_consent', False),
-                learning_enabled=data.get('learning_enabled', True)
-            )
-            
-            return jsonify({
-                'user_id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'created_at': user.created_at.isoformat()
-            }), 201
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        
+        # Check if user already exists
+        existing_user = user_repo.get_user_by_username(data['username'])
+        if existing_user:
+            return jsonify({'error': 'User already exists'}), 409
+        
+        # Create new user
+        user = user_repo.create_user(
+            username=data['username'],
+            email=data.get('email'),
+            data_sharing_consent=data.get('data_sharing_consent', False),
+            learning_enabled=data.get('learning_enabled', True)
+        )
+        
+        return jsonify({
+            'user_id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'created_at': user.created_at.isoformat()
+        }), 201
     
     except Exception as e:
-        logger.error(f"Create user error: {e}")
+        logger.error("Create user error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -654,22 +1311,21 @@ def create_user():
 def get_user(user_id):
     """Get user information"""
     try:
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            user = user_repo.get_user_by_id(user_id)
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        
+        user_data = get_cached_user(user_id)
+        if user_data is None:
+            user = user_repo.get_user_by_id(user_id, with_profile=True)
             
             if not user:
                 raise NotFound('User not found')
             
-            # Update last activity
-            user_repo.update_user_activity(user_id)
-            
-            return jsonify({
+            user_data = {
                 'user_id': user.id,
                 'username': user.username,
                 'email': user.email,
                 'created_at': user.created_at.isoformat(),
-                'last_active': user.last_active.isoformat(),
                 'learning_enabled': user.learning_enabled,
                 'profile': {
                     'preferred_language': user.profile.preferred_language,
@@ -678,10 +1334,19 @@ def get_user(user_id):
                     'interests': user.profile.interests,
                     'hobbies': user.profile.hobbies
                 } if user.profile else None
-            }), 200
+            }
+            cache_user(user_id, user_data)
+        
+        # Update last activity, at most once per interval
+        last_active = record_user_activity(user_repo, user_id)
+        if last_active is None:
+            invalidate_user_cache(user_id)
+            raise NotFound('User not found')
+        
+        return jsonify({**user_data, 'last_active': last_active.isoformat()}), 200
     
     except Exception as e:
-        logger.error(f"Get user error: {e}")
+        logger.error("Get user error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -693,28 +1358,116 @@ def update_user_profile(user_id):
         if not data:
             raise BadRequest('Profile data is required')
         
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            user = user_repo.get_user_by_id(user_id)
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        user = user_repo.get_user_by_id(user_id, with_profile=True)
+        
+        if not user:
+            raise NotFound('User not found')
+        
+        # Update profile fields
+        profile = user.profile
+        if profile:
+            for field in ['preferred_language', 'communication_style', 'response_length_preference',
+                         'technical_level', 'interests', 'hobbies', 'explanation_detail_level']:
+                if field in data:
+                    setattr(profile, field, data[field])
             
-            if not user:
-                raise NotFound('User not found')
+            profile.updated_at = datetime.utcnow()
+        
+        # Drop the cached user once the update is committed; dropping it now
+        # would let a concurrent read cache the old profile again
+        run_after_commit(invalidate_user_cache, user_id)
+        
+        return jsonify({'message': 'Profile updated successfully'}), 200
+    
+    except Exception as e:
+        logger.error("Update profile error: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+def learn_from_interactions(user_id, interaction_ids):
+    """Run the learning engine on stored interactions not yet processed (background task)"""
+    try:
+        with get_db_manager().get_session() as session:
+            interaction_repo = InteractionRepository(session)
+            fact_repo = LearnedFactRepository(session)
             
-            # Update profile fields
-            profile = user.profile
-            if profile:
-                for field in ['preferred_language', 'communication_style', 'response_length_preference',
-                             'technical_level', 'interests', 'hobbies', 'explanation_detail_level']:
-                    if field in data:
-                        setattr(profile, field, data[field])
-                
-                profile.updated_at = datetime.utcnow()
+            # Claim the interactions first, so a concurrent /learn call does
+            # not learn from them again
+            interactions = interaction_repo.claim_unprocessed_interactions(user_id, interaction_ids)
+            if not interactions:
+                return
+            
+            learning_result = learning_engine.process_user_interactions(user_id, interactions)
             
-            return jsonify({'message': 'Profile updated successfully'}), 200
+            # Store any new learned facts
+            fact_repo.bulk_upsert_facts(learning_result.new_facts)
+        
+        if learning_result.new_facts:
+            publish_user_update(user_id, 'fact')
     
     except Exception as e:
-        logger.error(f"Update profile error: {e}")
-        return jsonify({'error': str(e)}), 500
+        logger.error("Background learning error: %s", e)
+
+
+def _learning_pending_key(user_id):
+    return f"user:{user_id}:learn_pending"
+
+
+def schedule_recent_learning(user_id):
+    """Queue learn_from_recent for a user unless a run is already pending"""
+    with pending_learning_lock:
+        if user_id in pending_learning_users:
+            return
+        pending_learning_users.add(user_id)
+    
+    # Coalesce across worker processes too when Redis is available
+    if redis_client is not None:
+        try:
+            if not redis_client.set(_learning_pending_key(user_id), 1, nx=True, ex=LEARNING_PENDING_TTL):
+                with pending_learning_lock:
+                    pending_learning_users.discard(user_id)
+                return
+        except redis.RedisError as e:
+            logger.error("Learning queue error: %s", e)
+    
+    learning_executor.submit(learn_from_recent, user_id)
+
+
+def learn_from_recent(user_id):
+    """Run the learning engine on a user's not yet processed interactions (background task)"""
+    # Clear the pending marker first, so messages logged during this run
+    # queue another one
+    with pending_learning_lock:
+        pending_learning_users.discard(user_id)
+    if redis_client is not None:
+        try:
+            redis_client.delete(_learning_pending_key(user_id))
+        except redis.RedisError as e:
+            logger.error("Learning queue error: %s", e)
+    
+    try:
+        with get_db_manager().get_session() as session:
+            interaction_repo = InteractionRepository(session)
+            fact_repo = LearnedFactRepository(session)
+            
+            # Claim the messages logged since the last run; re-learning from
+            # already learned rows would add their evidence to the facts again
+            interactions = interaction_repo.claim_unprocessed_interactions(user_id)
+            if not interactions:
+                return
+            
+            learning_result = learning_engine.process_user_interactions(user_id, interactions)
+            
+            # Store any new facts
+            fact_repo.bulk_upsert_facts(learning_result.new_facts)
+        
+        if learning_result.new_facts:
+            publish_user_update(user_id, 'fact')
+    
+    except Exception as e:
+        logger.error("Background learning error: %s", e)
 
 
 # Interaction endpoints
@@ -726,47 +1479,99 @@ def create_interaction(user_id):
         if not data or 'content' not in data:
             raise BadRequest('Interaction content is required')
         
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            interaction_repo = InteractionRepository(session)
-            
-            # Verify user exists
-            user = user_repo.get_user_by_id(user_id)
-            if not user:
-                raise NotFound('User not found')
-            
-            # Create interaction
-            interaction = interaction_repo.create_interaction(
-                user_id=user_id,
-                interaction_type=data.get('type', InteractionType.MESSAGE.value),
-                content=data['content'],
-                context=data.get('context'),
-                session_id=data.get('session_id'),
-                source=data.get('source', 'api')
-            )
-            
-            # Trigger learning if enabled
-            if user.learning_enabled:
-                # Process this interaction immediately for real-time learning
-                learning_result = learning_engine.process_user_interactions(user_id, [interaction])
-                
-                # Store any new learned facts
-                if learning_result.new_facts:
-                    fact_repo = LearnedFactRepository(session)
-                    for fact_data in learning_result.new_facts:
-                        fact_repo.create_or_update_fact(**fact_data)
-                
-                # Mark interaction as processed
-                interaction_repo.mark_interaction_processed(interaction.id)
-            
-            return jsonify({
-                'interaction_id': interaction.id,
-                'timestamp': interaction.timestamp.isoformat(),
-                'learning_enabled': user.learning_enabled
-            }), 201
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        interaction_repo = InteractionRepository(session)
+        
+        # Verify user exists
+        user = user_repo.get_user_by_id(user_id)
+        if not user:
+            raise NotFound('User not found')
+        
+        # Create interaction
+        interaction = interaction_repo.create_interaction(
+            user_id=user_id,
+            interaction_type=data.get('type', InteractionType.MESSAGE.value),
+            content=data['content'],
+            context=data.get('context'),
+            session_id=data.get('session_id'),
+            source=data.get('source', 'api')
+        )
+        
+        session.flush()  # Assign the ID and timestamp
+        run_after_commit(publish_user_update, user_id, 'interaction')
+        
+        # Trigger learning if enabled, once the request's single commit has
+        # made the interaction visible to the background worker
+        if user.learning_enabled:
+            run_after_commit(learning_executor.submit, learn_from_interactions, user_id, [interaction.id])
+        
+        return jsonify({
+            'interaction_id': interaction.id,
+            'timestamp': interaction.timestamp.isoformat(),
+            'learning_enabled': user.learning_enabled
+        }), 202 if user.learning_enabled else 201
+    
+    except Exception as e:
+        logger.error("Create interaction error: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/users/<int:user_id>/interactions/batch', methods=['POST'])
+def create_interactions_batch(user_id):
+    """
+    Record several user interactions in one request
+    
+    Expected payload:
+    {
+        "interactions": [
+            {"type": "message", "content": "Hello"},
+            {"type": "preference", "content": "I like music", "source": "web"}
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        interactions_data = data.get('interactions') if data else None
+        if not interactions_data or any('content' not in item for item in interactions_data):
+            raise BadRequest('A list of interactions with content is required')
+        
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        interaction_repo = InteractionRepository(session)
+        
+        # Verify user exists
+        user = user_repo.get_user_by_id(user_id)
+        if not user:
+            raise NotFound('User not found')
+        
+        # Create interactions in one batch
+        interactions = interaction_repo.bulk_create_interactions([
+            {
+                'user_id': user_id,
+                'interaction_type': item.get('type', InteractionType.MESSAGE.value),
+                'content': item['content'],
+                'context': item.get('context'),
+                'session_id': item.get('session_id'),
+                'source': item.get('source', 'api')
+            }
+            for item in interactions_data
+        ])
+        interaction_ids = [interaction.id for interaction in interactions]
+        run_after_commit(publish_user_update, user_id, 'interaction')
+        
+        # Learn from the whole batch in one background task
+        if user.learning_enabled:
+            run_after_commit(learning_executor.submit, learn_from_interactions, user_id, interaction_ids)
+        
+        return jsonify({
+            'interaction_ids': interaction_ids,
+            'count': len(interaction_ids),
+            'learning_enabled': user.learning_enabled
+        }), 202 if user.learning_enabled else 201
     
     except Exception as e:
-        logger.error(f"Create interaction error: {e}")
+        logger.error("Create interactions batch error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -776,106 +1581,105 @@ def get_user_interactions(user_id):
     try:
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
+        before_id = request.args.get('before_id', type=int)  # Cursor from next_cursor
         
-        with db_manager.get_session() as session:
-            interaction_repo = InteractionRepository(session)
-            interactions = interaction_repo.get_user_interactions(user_id, limit, offset)
-            
-            return jsonify({
-                'interactions': [{
-                    'id': i.id,
-                    'type': i.interaction_type,
-                    'content': i.content,
-                    'timestamp': i.timestamp.isoformat(),
-                    'sentiment': i.sentiment,
-                    'topics': i.topics,
-                    'intent': i.intent
-                } for i in interactions],
-                'count': len(interactions)
-            }), 200
+        session = get_request_session()
+        interaction_repo = InteractionRepository(session)
+        interactions = interaction_repo.get_user_interaction_rows(user_id, limit, offset, before_id=before_id)
+        
+        return jsonify({
+            'interactions': serialize_rows(interactions),
+            'count': len(interactions),
+            'next_cursor': interactions[-1].id if interactions and len(interactions) == limit else None
+        }), 200
     
     except Exception as e:
-        logger.error(f"Get interactions error: {e}")
+        logger.error("Get interactions error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
 # Learning endpoints
 @app.route('/api/users/<int:user_id>/learn', methods=['POST'])
 def trigger_learning(user_id):
-    """Trigger learning process for a user"""
+    """Trigger learning process for a user
+    
+    With ?include=facts the user's learned facts (capped by ?limit=) are
+    returned as well, saving a follow-up request.
+    """
     try:
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            interaction_repo = InteractionRepository(session)
-            fact_repo = LearnedFactRepository(session)
-            
-            # Get user
-            user = user_repo.get_user_by_id(user_id)
-            if not user:
-                raise NotFound('User not found')
-            
-            if not user.learning_enabled:
-                return jsonify({'message': 'Learning is disabled for this user'}), 400
-            
-            # Get unprocessed interactions
-            unprocessed = interaction_repo.get_unprocessed_interactions(user_id)
-            
-            if not unprocessed:
-                return jsonify({'message': 'No new interactions to process'}), 200
-            
-            # Run learning engine
-            result = learning_engine.process_user_interactions(user_id, unprocessed)
-            
-            # Store new facts
-            for fact_data in result.new_facts:
-                fact_repo.create_or_update_fact(**fact_data)
-            
-            # Mark interactions as processed
-            for interaction in unprocessed:
-                interaction_repo.mark_interaction_processed(interaction.id)
-            
-            return jsonify({
-                'message': 'Learning completed',
-                'processed_interactions': len(unprocessed),
-                'new_facts': len(result.new_facts),
-                'insights': len(result.insights),
-                'processing_time_ms': result.processing_time_ms
-            }), 200
+        include = request.args.get('include', '').split(',')
+        limit = request.args.get('limit', type=int)
+        
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        interaction_repo = InteractionRepository(session)
+        fact_repo = LearnedFactRepository(session)
+        
+        # Get user
+        user = user_repo.get_user_by_id(user_id)
+        if not user:
+            raise NotFound('User not found')
+        
+        if not user.learning_enabled:
+            return jsonify({'message': 'Learning is disabled for this user'}), 400
+        
+        # Claim the unprocessed interactions; ones already claimed by
+        # background learning are skipped rather than counted twice
+        unprocessed = interaction_repo.claim_unprocessed_interactions(user_id)
+        
+        if not unprocessed:
+            response = {'message': 'No new interactions to process', 'processed_interactions': 0, 'new_facts': 0}
+            if 'facts' in include:
+                response['facts'] = serialize_rows(fact_repo.get_user_fact_rows(user_id, limit=limit))
+            return jsonify(response), 200
+        
+        # Run learning engine
+        result = learning_engine.process_user_interactions(user_id, unprocessed)
+        
+        # Store new facts
+        fact_repo.bulk_upsert_facts(result.new_facts)
+        
+        if result.new_facts:
+            run_after_commit(publish_user_update, user_id, 'fact')
+        
+        response = {
+            'message': 'Learning completed',
+            'processed_interactions': len(unprocessed),
+            'new_facts': len(result.new_facts),
+            'insights': len(result.insights),
+            'processing_time_ms': result.processing_time_ms
+        }
+        if 'facts' in include:
+            response['facts'] = serialize_rows(fact_repo.get_user_fact_rows(user_id, limit=limit))
+        
+        return jsonify(response), 200
     
     except Exception as e:
-        logger.error(f"Learning trigger error: {e}")
+        logger.error("Learning trigger error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/users/<int:user_id>/facts', methods=['GET'])
 def get_learned_facts(user_id):
-    """Get learned facts about a user"""
+    """Get learned facts about a user, optionally for one category or a
+    comma-separated list of categories, and at most `limit` of them"""
     try:
         category = request.args.get('category')
+        if request.args.get('categories'):
+            category = request.args['categories'].split(',')
+        limit = request.args.get('limit', type=int)
         
-        with db_manager.get_session() as session:
-            fact_repo = LearnedFactRepository(session)
-            facts = fact_repo.get_user_facts(user_id, category)
-            
-            return jsonify({
-                'facts': [{
-                    'id': f.id,
-                    'category': f.category,
-                    'fact_type': f.fact_type,
-                    'fact_key': f.fact_key,
-                    'fact_value': f.fact_value,
-                    'confidence_level': f.confidence_level,
-                    'evidence_count': f.evidence_count,
-                    'first_observed': f.first_observed.isoformat(),
-                    'last_updated': f.last_updated.isoformat(),
-                    'user_confirmed': f.user_confirmed,
-                    'learning_method': f.learning_method
-                } for f in facts],
-                'count': len(facts)
-            }), 200
+        session = get_request_session()
+        fact_repo = LearnedFactRepository(session)
+        facts = fact_repo.get_user_fact_rows(user_id, category, limit=limit)
+        
+        return jsonify({
+            'facts': serialize_rows(facts),
+            'count': len(facts)
+        }), 200
     
     except Exception as e:
-        logger.error(f"Get facts error: {e}")
+        logger.error("Get facts error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -886,17 +1690,18 @@ def confirm_fact(user_id, fact_id):
         data = request.get_json()
         confirmed = data.get('confirmed', True) if data else True
         
-        with db_manager.get_session() as session:
-            fact_repo = LearnedFactRepository(session)
-            fact_repo.confirm_fact(fact_id, confirmed)
-            
-            return jsonify({
-                'message': f'Fact {"confirmed" if confirmed else "rejected"}',
-                'fact_id': fact_id
-            }), 200
+        session = get_request_session()
+        fact_repo = LearnedFactRepository(session)
+        fact_repo.confirm_fact(fact_id, confirmed)
+        run_after_commit(invalidate_analytics_cache, user_id)
+        
+        return jsonify({
+            'message': f'Fact {"confirmed" if confirmed else "rejected"}',
+            'fact_id': fact_id
+        }), 200
     
     except Exception as e:
-        logger.error(f"Confirm fact error: {e}")
+        logger.error("Confirm fact error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -905,51 +1710,47 @@ def confirm_fact(user_id, fact_id):
 def get_user_analytics(user_id):
     """Get analytics and insights about a user"""
     try:
-        with db_manager.get_session() as session:
-            user_repo = UserRepository(session)
-            interaction_repo = InteractionRepository(session)
-            fact_repo = LearnedFactRepository(session)
-            
-            # Get user
-            user = user_repo.get_user_by_id(user_id)
-            if not user:
-                raise NotFound('User not found')
-            
-            # Get recent interactions for analysis
-            recent_interactions = interaction_repo.get_user_interactions(user_id, limit=100)
-            all_facts = fact_repo.get_user_facts(user_id)
-            
-            # Generate analytics
-            analytics = {
-                'user_summary': {
-                    'total_interactions': len(recent_interactions),
-                    'total_facts_learned': len(all_facts),
-                    'member_since': user.created_at.isoformat(),
-                    'last_active': user.last_active.isoformat()
-                },
-                'interaction_stats': {
-                    'average_sentiment': sum(i.sentiment or 0 for i in recent_interactions) / max(len(recent_interactions), 1),
-                    'most_common_intent': None,  # Would calculate this
-                    'top_topics': []  # Would extract from interactions
-                },
-                'learning_progress': {
-                    'facts_by_category': {},
-                    'confidence_distribution': {},
-                    'recent_learnings': []
-                }
-            }
-            
-            # Calculate facts by category
-            for fact in all_facts:
-                category = fact.category
-                if category not in analytics['learning_progress']['facts_by_category']:
-                    analytics['learning_progress']['facts_by_category'][category] = 0
-                analytics['learning_progress']['facts_by_category'][category] += 1
-            
+        analytics = get_cached_analytics(user_id)
+        if analytics is not None:
             return jsonify(analytics), 200
+        
+        session = get_request_session()
+        user_repo = UserRepository(session)
+        fact_repo = LearnedFactRepository(session)
+        
+        # Get user with interaction aggregates, computed in the database in
+        # one query instead of loading rows
+        summary = user_repo.get_user_activity_summary(user_id)
+        if not summary:
+            raise NotFound('User not found')
+        
+        facts_by_category, facts_by_confidence = fact_repo.count_facts_by_category_and_confidence(user_id)
+        
+        # Generate analytics
+        analytics = {
+            'user_summary': {
+                'total_interactions': summary.total_interactions,
+                'total_facts_learned': sum(facts_by_category.values()),
+                'member_since': summary.created_at,
+                'last_active': summary.last_active
+            },
+            'interaction_stats': {
+                'average_sentiment': summary.average_sentiment or 0.0,
+                'most_common_intent': summary.most_common_intent,
+                'top_topics': []  # Would extract from interactions
+            },
+            'learning_progress': {
+                'facts_by_category': facts_by_category,
+                'confidence_distribution': facts_by_confidence,
+                'recent_learnings': []
+            }
+        }
+        
+        cache_analytics(user_id, analytics)
+        return jsonify(analytics), 200
     
     except Exception as e:
-        logger.error(f"Analytics error: {e}")
+        logger.error("Analytics error: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -967,18 +1768,20 @@ def user_dashboard(user_id):
 
 
 if __name__ == '__main__':
+    atexit.register(start_log_listener().stop)
+    
     # Initialize database if it doesn't exist
     try:
-        if not db_manager.health_check():
+        if not get_db_manager().health_check():
             logger.info("Database not found, initializing...")
             from database import init_database
             init_database()
     except Exception as e:
-        logger.error(f"Database initialization error: {e}")
+        logger.error("Database initialization error: %s", e)
     
     # Run the application
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('DEBUG', 'False').lower() == 'true'
     
-    logger.info(f"Starting AI User Learning System on port {port}")
+    logger.info("Starting AI User Learning System on port %s", port)
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
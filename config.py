@@ -86,15 +86,15 @@ class TestingConfig(Config):
     JWT_SECRET_KEY = 'testing-jwt-secret'
 
 
+CONFIG_MAP = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig
+}
+
+
 # Configuration factory
 def get_config(env_name: str = None):
     """Get configuration based on environment name"""
     env_name = env_name or os.getenv('FLASK_ENV', 'development')
-    
-    config_map = {
-        'development': DevelopmentConfig,
-        'production': ProductionConfig,
-        'testing': TestingConfig
-    }
-    
-    return config_map.get(env_name, DevelopmentConfig)
\ No newline at end of file
+    return CONFIG_MAP.get(env_name, DevelopmentConfig)
\ No newline at end of file
@@ -4,17 +4,33 @@ Database configuration and utilities for the AI User Learning System
 
 import os
 import logging
-from sqlalchemy import create_engine, event, text
-from sqlalchemy.orm import sessionmaker, Session
+import threading
+from collections import Counter
+from sqlalchemy import create_engine, event, func, inspect, lambda_stmt, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row, make_url
+from sqlalchemy.orm import sessionmaker, Session, defer, joinedload
 from sqlalchemy.pool import StaticPool
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import Dict, Generator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from models import Base, User, UserProfile, UserInteraction, LearnedFact, UserPreference, LearningSession
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Dialects with INSERT ... ON CONFLICT DO UPDATE support
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
 
 class DatabaseConfig:
     """Database configuration class"""
@@ -24,6 +40,19 @@ class DatabaseConfig:
         self.echo = os.getenv('DATABASE_ECHO', 'False').lower() == 'true'
         self.pool_size = int(os.getenv('DATABASE_POOL_SIZE', '5'))
         self.max_overflow = int(os.getenv('DATABASE_MAX_OVERFLOW', '10'))
+        self.pool_recycle = int(os.getenv('DATABASE_POOL_RECYCLE', '1800'))  # seconds
+        self.pool_pre_ping = os.getenv('DATABASE_POOL_PRE_PING', 'True').lower() == 'true'
+        self.query_cache_size = int(os.getenv('DATABASE_QUERY_CACHE_SIZE', '1200'))  # compiled statements
+
+
+def _json_engine_options() -> dict:
+    """Engine options that encode JSON columns with orjson when it is installed"""
+    if orjson is None:
+        return {}
+    return {
+        'json_serializer': lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode(),
+        'json_deserializer': orjson.loads,
+    }
 
 
 class DatabaseManager:
@@ -35,27 +64,50 @@ class DatabaseManager:
         self.SessionLocal = None
         self._initialize_database()
     
+    @staticmethod
+    def _is_sqlite_memory_url(database_url: str) -> bool:
+        """Check whether a SQLite URL points at an in-memory database"""
+        database = make_url(database_url).database
+        return not database or database == ':memory:' or 'mode=memory' in database_url
+    
     def _initialize_database(self):
         """Initialize database engine and session factory"""
         try:
             # Create engine
             if self.config.database_url.startswith('sqlite'):
-                # SQLite specific configuration
+                # SQLite specific configuration. A file database gets a pool
+                # of connections so readers run concurrently under WAL; an
+                # in-memory database only exists on a single shared connection
+                if self._is_sqlite_memory_url(self.config.database_url):
+                    pool_options = {'poolclass': StaticPool}
+                else:
+                    pool_options = {
+                        'pool_size': self.config.pool_size,
+                        'max_overflow': self.config.max_overflow,
+                    }
+                
                 self.engine = create_engine(
                     self.config.database_url,
                     echo=self.config.echo,
-                    poolclass=StaticPool,
                     connect_args={
                         "check_same_thread": False,
                         "timeout": 30
-                    }
+                    },
+                    query_cache_size=self.config.query_cache_size,
+                    **pool_options,
+                    **_json_engine_options()
                 )
                 
-                # Enable foreign keys for SQLite
+                # Enable foreign keys and WAL for SQLite
                 @event.listens_for(self.engine, "connect")
                 def set_sqlite_pragma(dbapi_connection, connection_record):
                     cursor = dbapi_connection.cursor()
                     cursor.execute("PRAGMA foreign_keys=ON")
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                    cursor.execute("PRAGMA synchronous=NORMAL")
+                    cursor.execute("PRAGMA cache_size=-64000")  # 64 MB
+                    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+                    cursor.execute("PRAGMA temp_store=MEMORY")
                     cursor.close()
                     
             else:
@@ -64,38 +116,109 @@ class DatabaseManager:
                     self.config.database_url,
                     echo=self.config.echo,
                     pool_size=self.config.pool_size,
-                    max_overflow=self.config.max_overflow
+                    max_overflow=self.config.max_overflow,
+                    # Recycling connections before server-side idle timeouts
+                    # covers most stale connections; pre-ping adds a round
+                    # trip per checkout and can be turned off with it
+                    pool_recycle=self.config.pool_recycle,
+                    pool_pre_ping=self.config.pool_pre_ping,
+                    query_cache_size=self.config.query_cache_size,
+                    **_json_engine_options()
                 )
             
             # Create session factory
             self.SessionLocal = sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
                 bind=self.engine
             )
             
-            logger.info(f"Database initialized: {self.config.database_url}")
+            logger.info("Database initialized: %s", self.config.database_url)
             
         except Exception as e:
-            logger.error(f"Failed to initialize database: {e}")
+            logger.error("Failed to initialize database: %s", e)
             raise
     
     def create_tables(self):
         """Create all database tables"""
         try:
             Base.metadata.create_all(bind=self.engine)
+            self._create_missing_indexes()
+            self._ensure_fact_unique_key()
             logger.info("Database tables created successfully")
         except Exception as e:
-            logger.error(f"Failed to create tables: {e}")
+            logger.error("Failed to create tables: %s", e)
             raise
     
+    def _create_missing_indexes(self):
+        """Create model indexes missing from tables that already existed;
+        create_all only creates indexes together with a new table"""
+        inspector = inspect(self.engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    logger.info("Adding index %s", index.name)
+                    index.create(bind=self.engine)
+    
+    def _ensure_fact_unique_key(self):
+        """Add the (user_id, category, fact_key) unique key that fact upserts
+        conflict on to learned_facts tables created before it existed"""
+        columns = ['user_id', 'category', 'fact_key']
+        inspector = inspect(self.engine)
+        if any(constraint['column_names'] == columns
+               for constraint in inspector.get_unique_constraints(LearnedFact.__tablename__)):
+            return
+        if any(index['unique'] and index['column_names'] == columns
+               for index in inspector.get_indexes(LearnedFact.__tablename__)):
+            return
+        
+        logger.info("Adding unique key on learned_facts (user_id, category, fact_key)")
+        with self.engine.begin() as connection:
+            self._merge_duplicate_facts(connection)
+            # Plain DDL: an Index on the model's columns would attach itself to
+            # the shared table metadata and be created again by later create_all calls
+            connection.execute(text(
+                'CREATE UNIQUE INDEX uq_learned_facts_user_category_key '
+                'ON learned_facts (user_id, category, fact_key)'
+            ))
+    
+    @staticmethod
+    def _merge_duplicate_facts(connection):
+        """Fold facts stored more than once for a (user_id, category, fact_key),
+        which the old lookup-then-insert upsert could race into, so the unique
+        key can be added: the most recently updated row is kept and given the
+        summed evidence count"""
+        facts = LearnedFact.__table__
+        duplicate_keys = connection.execute(
+            select(facts.c.user_id, facts.c.category, facts.c.fact_key)
+            .group_by(facts.c.user_id, facts.c.category, facts.c.fact_key)
+            .having(func.count() > 1)
+        ).all()
+        
+        for user_id, category, fact_key in duplicate_keys:
+            rows = connection.execute(
+                select(facts.c.id, facts.c.evidence_count)
+                .where(facts.c.user_id == user_id, facts.c.category == category, facts.c.fact_key == fact_key)
+                .order_by(facts.c.last_updated.desc(), facts.c.id.desc())
+            ).all()
+            connection.execute(
+                facts.update().where(facts.c.id == rows[0].id)
+                .values(evidence_count=sum(row.evidence_count or 1 for row in rows))
+            )
+            connection.execute(facts.delete().where(facts.c.id.in_([row.id for row in rows[1:]])))
+        
+        if duplicate_keys:
+            logger.warning("Merged duplicate learned facts for %d keys", len(duplicate_keys))
+    
     def drop_tables(self):
         """Drop all database tables (use with caution!)"""
         try:
             Base.metadata.drop_all(bind=self.engine)
             logger.info("Database tables dropped successfully")
         except Exception as e:
-            logger.error(f"Failed to drop tables: {e}")
+            logger.error("Failed to drop tables: %s", e)
             raise
     
     @contextmanager
@@ -107,7 +230,7 @@ class DatabaseManager:
             session.commit()
         except Exception as e:
             session.rollback()
-            logger.error(f"Database session error: {e}")
+            logger.error("Database session error: %s", e)
             raise
         finally:
             session.close()
@@ -119,31 +242,53 @@ class DatabaseManager:
     def health_check(self) -> bool:
         """Check if database is accessible"""
         try:
-            with self.get_session() as session:
-                session.execute(text("SELECT 1"))
+            # A bare connection is enough to ping the database; no ORM session
+            # or commit is needed for a read-only probe
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
             return True
         except Exception as e:
-            logger.error(f"Database health check failed: {e}")
+            logger.error("Database health check failed: %s", e)
             return False
 
 
-# Global database manager instance
-db_manager = DatabaseManager()
+# Global database manager instance, created on first use so importing the
+# package (e.g. for the repository classes) does not create an engine
+_db_manager: Optional[DatabaseManager] = None
+_db_manager_lock = threading.Lock()
+
+
+def get_db_manager() -> DatabaseManager:
+    """Get the global database manager, creating it on first call"""
+    global _db_manager
+    if _db_manager is None:
+        with _db_manager_lock:
+            if _db_manager is None:
+                _db_manager = DatabaseManager()
+    return _db_manager
+
+
+def __getattr__(name):
+    # Keeps `from database import db_manager` working
+    if name == 'db_manager':
+        return get_db_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db_session() -> Generator[Session, None, None]:
     """Dependency injection for database sessions"""
-    with db_manager.get_session() as session:
+    with get_db_manager().get_session() as session:
         yield session
 
 
 def init_database():
     """Initialize the database with tables"""
-    db_manager.create_tables()
+    get_db_manager().create_tables()
 
 
 def reset_database():
     """Reset the database (drop and recreate tables)"""
+    db_manager = get_db_manager()
     db_manager.drop_tables()
     db_manager.create_tables()
 
@@ -166,24 +311,71 @@ class UserRepository:
         
         return user
     
-    def get_user_by_id(self, user_id: int) -> Optional[User]:
-        """Get user by ID"""
-        return self.session.query(User).filter(User.id == user_id).first()
+    def get_user_by_id(self, user_id: int, with_profile: bool = False) -> Optional[User]:
+        """Get user by ID
+        
+        With with_profile, the one-to-one profile is loaded in the same query
+        (a JOIN adds no rows for it). The one-to-many collections are never
+        eager-loaded; callers query them through the repositories with limits.
+        A user already loaded in the session is returned without a query.
+        """
+        options = [joinedload(User.profile)] if with_profile else None
+        return self.session.get(User, user_id, options=options)
+    
+    # Hot lookups are built with lambda_stmt: the statement is constructed
+    # once per lambda and reused with new parameter values, instead of being
+    # rebuilt and cache-keyed on every call
     
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
-        return self.session.query(User).filter(User.username == username).first()
+        stmt = lambda_stmt(lambda: select(User).where(User.username == username).limit(1))
+        return self.session.scalars(stmt).first()
+    
+    def get_user_id_by_username(self, username: str) -> Optional[int]:
+        """Get just the ID of the user with a username"""
+        stmt = lambda_stmt(lambda: select(User.id).where(User.username == username))
+        return self.session.scalar(stmt)
     
     def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
-        return self.session.query(User).filter(User.email == email).first()
+        stmt = lambda_stmt(lambda: select(User).where(User.email == email).limit(1))
+        return self.session.scalars(stmt).first()
+    
+    def get_user_activity_summary(self, user_id: int) -> Optional[Row]:
+        """Get a user's created_at and last_active with their interaction count,
+        average sentiment (unscored as 0) and most common intent, or None if
+        there is no such user
+        
+        The interaction aggregates are correlated subqueries of the user
+        SELECT, so everything arrives in one round trip.
+        """
+        user_interactions = UserInteraction.user_id == User.id
+        stmt = select(
+            User.created_at,
+            User.last_active,
+            select(func.count(UserInteraction.id))
+            .where(user_interactions)
+            .scalar_subquery().label('total_interactions'),
+            select(func.avg(func.coalesce(UserInteraction.sentiment, 0.0)))
+            .where(user_interactions)
+            .scalar_subquery().label('average_sentiment'),
+            select(UserInteraction.intent)
+            .where(user_interactions, UserInteraction.intent.isnot(None))
+            .group_by(UserInteraction.intent)
+            .order_by(func.count(UserInteraction.id).desc())
+            .limit(1)
+            .scalar_subquery().label('most_common_intent')
+        ).where(User.id == user_id)
+        return self.session.execute(stmt).one_or_none()
     
     def update_user_activity(self, user_id: int):
-        """Update user's last activity timestamp"""
+        """Update user's last activity timestamp; returns it, or None if there is no such user"""
         from datetime import datetime
-        user = self.get_user_by_id(user_id)
-        if user:
-            user.last_active = datetime.utcnow()
+        last_active = datetime.utcnow()
+        updated = (self.session.query(User)
+                   .filter(User.id == user_id)
+                   .update({User.last_active: last_active}, synchronize_session=False))
+        return last_active if updated else None
     
     def delete_user(self, user_id: int) -> bool:
         """Delete a user and all associated data"""
@@ -194,9 +386,20 @@ class UserRepository:
         return False
 
 
+# Interaction columns the learning engine never reads, left out of the
+# SELECT when loading interactions for it; they still load on first access
+LEARNING_DEFERRED_COLUMNS = (
+    defer(UserInteraction.context),
+    defer(UserInteraction.session_id),
+    defer(UserInteraction.source),
+)
+
+
 class InteractionRepository:
     """Repository pattern for UserInteraction operations"""
     
+    UPDATE_BATCH_SIZE = 10000  # IDs per bulk UPDATE statement
+    
     def __init__(self, session: Session):
         self.session = session
     
@@ -211,27 +414,159 @@ class InteractionRepository:
         self.session.add(interaction)
         return interaction
     
-    def get_user_interactions(self, user_id: int, limit: int = 100, offset: int = 0) -> list[UserInteraction]:
-        """Get user interactions with pagination"""
-        return (self.session.query(UserInteraction)
+    def bulk_create_interactions(self, rows: list[dict]) -> list[UserInteraction]:
+        """Create many interactions; their INSERTs are sent as one batch on flush"""
+        interactions = [UserInteraction(**row) for row in rows]
+        self.session.add_all(interactions)
+        self.session.flush()  # Get the IDs without committing
+        return interactions
+    
+    def get_user_interactions(self, user_id: int, limit: int = 100, offset: int = 0,
+                              before_id: Optional[int] = None) -> list[UserInteraction]:
+        """Get user interactions with pagination, newest first, for learning
+        
+        Passing before_id (the last ID of the previous page) uses keyset
+        pagination, which stays O(limit) however deep the client pages;
+        offset is kept for existing callers. Columns in
+        LEARNING_DEFERRED_COLUMNS are not loaded up front.
+        """
+        stmt = lambda_stmt(lambda: select(UserInteraction).options(*LEARNING_DEFERRED_COLUMNS))
+        return self.session.scalars(
+            self._paginate_user_interactions(stmt, user_id, limit, offset, before_id)
+        ).all()
+    
+    def get_user_interaction_rows(self, user_id: int, limit: int = 100, offset: int = 0,
+                                  before_id: Optional[int] = None) -> list[Row]:
+        """Like get_user_interactions, but returns plain rows of the listed columns
+        
+        For read-only listings: skips ORM instance construction and the
+        identity map, and leaves the context column out of the SELECT.
+        """
+        stmt = lambda_stmt(lambda: select(
+            UserInteraction.id,
+            UserInteraction.interaction_type.label('type'),
+            UserInteraction.content,
+            UserInteraction.timestamp,
+            UserInteraction.sentiment,
+            UserInteraction.topics,
+            UserInteraction.intent
+        ))
+        return self.session.execute(
+            self._paginate_user_interactions(stmt, user_id, limit, offset, before_id)
+        ).all()
+    
+    @staticmethod
+    def _paginate_user_interactions(stmt, user_id: int, limit: int, offset: int, before_id: Optional[int]):
+        stmt += lambda s: s.where(UserInteraction.user_id == user_id)
+        if before_id is not None:
+            stmt += lambda s: (s.where(UserInteraction.id < before_id)
+                               .order_by(UserInteraction.id.desc())
+                               .limit(limit))
+            return stmt
+        stmt += lambda s: (s.order_by(UserInteraction.timestamp.desc())
+                           .limit(limit)
+                           .offset(offset))
+        return stmt
+    
+    def get_latest_interaction_id(self, user_id: int) -> Optional[int]:
+        """Get the ID of a user's newest interaction, a cheap change marker"""
+        return (self.session.query(func.max(UserInteraction.id))
                 .filter(UserInteraction.user_id == user_id)
-                .order_by(UserInteraction.timestamp.desc())
-                .limit(limit)
-                .offset(offset)
+                .scalar())
+    
+    def get_interaction_stats(self, user_id: int) -> Tuple[int, float]:
+        """Get the interaction count and average sentiment (unscored as 0) for a user"""
+        count, average_sentiment = (self.session.query(
+                                        func.count(UserInteraction.id),
+                                        func.avg(func.coalesce(UserInteraction.sentiment, 0.0)))
+                                    .filter(UserInteraction.user_id == user_id)
+                                    .one())
+        return count, average_sentiment or 0.0
+    
+    def get_most_common_intent(self, user_id: int) -> Optional[str]:
+        """Get the intent classified most often among a user's interactions"""
+        row = (self.session.query(UserInteraction.intent)
+               .filter(UserInteraction.user_id == user_id)
+               .filter(UserInteraction.intent.isnot(None))
+               .group_by(UserInteraction.intent)
+               .order_by(func.count(UserInteraction.id).desc())
+               .first())
+        return row.intent if row else None
+    
+    def get_interactions_by_ids(self, interaction_ids: list[int]) -> list[UserInteraction]:
+        """Get interactions by ID, oldest first, for learning"""
+        return (self.session.query(UserInteraction)
+                .options(*LEARNING_DEFERRED_COLUMNS)
+                .filter(UserInteraction.id.in_(interaction_ids))
+                .order_by(UserInteraction.id)
                 .all())
     
     def get_unprocessed_interactions(self, user_id: Optional[int] = None) -> list[UserInteraction]:
         """Get interactions that haven't been processed for learning"""
-        query = self.session.query(UserInteraction).filter(UserInteraction.processed == False)
+        query = (self.session.query(UserInteraction)
+                 .options(*LEARNING_DEFERRED_COLUMNS)
+                 .filter(UserInteraction.processed == False))
         if user_id:
             query = query.filter(UserInteraction.user_id == user_id)
         return query.all()
     
+    def claim_unprocessed_interactions(self, user_id: int,
+                                       interaction_ids: Optional[list[int]] = None) -> list[UserInteraction]:
+        """Mark a user's unprocessed interactions as processed and return them, oldest first
+        
+        The UPDATE only matches rows that are still unprocessed and RETURNs
+        the IDs it changed, so concurrent learning runs never pick up the same
+        interaction; rolling back the transaction releases the claim. The
+        returned interactions keep their loaded processed=False value, so the
+        learning engine still analyzes them. Pass interaction_ids to claim
+        only those.
+        """
+        criteria = [UserInteraction.user_id == user_id, UserInteraction.processed == False]
+        if interaction_ids is not None:
+            criteria.append(UserInteraction.id.in_(interaction_ids))
+        query = (select(UserInteraction)
+                 .options(*LEARNING_DEFERRED_COLUMNS)
+                 .where(*criteria)
+                 .order_by(UserInteraction.id))
+        
+        update_returning = self.session.get_bind().dialect.update_returning
+        if not update_returning:
+            # Lock the rows instead where UPDATE ... RETURNING is unavailable
+            query = query.with_for_update()
+        candidates = self.session.scalars(query).all()
+        if not update_returning:
+            self.mark_interactions_processed([interaction.id for interaction in candidates])
+            return candidates
+        
+        claimed_ids = set()
+        for start in range(0, len(candidates), self.UPDATE_BATCH_SIZE):
+            batch_ids = [interaction.id for interaction in candidates[start:start + self.UPDATE_BATCH_SIZE]]
+            claimed_ids.update(self.session.scalars(
+                update(UserInteraction)
+                .where(UserInteraction.id.in_(batch_ids), UserInteraction.processed == False)
+                .values(processed=True)
+                .returning(UserInteraction.id),
+                execution_options={'synchronize_session': False}
+            ))
+        return [interaction for interaction in candidates if interaction.id in claimed_ids]
+    
     def mark_interaction_processed(self, interaction_id: int):
         """Mark an interaction as processed"""
-        interaction = self.session.query(UserInteraction).filter(UserInteraction.id == interaction_id).first()
-        if interaction:
-            interaction.processed = True
+        self.mark_interactions_processed([interaction_id])
+    
+    def mark_interactions_processed(self, interaction_ids: list[int]):
+        """Mark several interactions as processed with one UPDATE per batch of IDs
+        
+        Interactions already loaded in the session keep their old processed
+        value until they are refreshed.
+        """
+        # Batches keep the IN list under the database's bound parameter limit.
+        # Skipping session synchronisation avoids evaluating the criteria
+        # against every object in the identity map
+        for start in range(0, len(interaction_ids), self.UPDATE_BATCH_SIZE):
+            (self.session.query(UserInteraction)
+             .filter(UserInteraction.id.in_(interaction_ids[start:start + self.UPDATE_BATCH_SIZE]))
+             .update({UserInteraction.processed: True}, synchronize_session=False))
 
 
 class LearnedFactRepository:
@@ -243,42 +578,155 @@ class LearnedFactRepository:
     def create_or_update_fact(self, user_id: int, category: str, fact_type: str, 
                              fact_key: str, fact_value: str, **kwargs) -> LearnedFact:
         """Create a new fact or update existing one"""
-        existing_fact = (self.session.query(LearnedFact)
-                        .filter(LearnedFact.user_id == user_id)
-                        .filter(LearnedFact.category == category)
-                        .filter(LearnedFact.fact_key == fact_key)
-                        .first())
+        return self.bulk_upsert_facts([{
+            'user_id': user_id,
+            'category': category,
+            'fact_type': fact_type,
+            'fact_key': fact_key,
+            'fact_value': fact_value,
+            **kwargs
+        }])[0]
+    
+    def bulk_upsert_facts(self, facts: list[dict]) -> list[LearnedFact]:
+        """Create or update many facts, matching them on (user_id, category, fact_key)
+        
+        Updating a fact replaces its value and adds to its evidence count. On
+        SQLite and PostgreSQL this is a single INSERT ... ON CONFLICT DO UPDATE
+        ... RETURNING statement. Returns the stored fact for each input.
+        """
+        if not facts:
+            return []
         
-        if existing_fact:
-            # Update existing fact
-            existing_fact.fact_value = fact_value
-            existing_fact.evidence_count += kwargs.get('evidence_count', 1)
-            from datetime import datetime
-            existing_fact.last_updated = datetime.utcnow()
-            return existing_fact
+        # Fold repeats of a fact into one row, as a statement may not
+        # update the same row twice
+        merged = {}
+        for fact_data in facts:
+            key = (fact_data['user_id'], fact_data['category'], fact_data['fact_key'])
+            previous = merged.get(key)
+            merged[key] = {
+                **(previous or fact_data),
+                'fact_value': fact_data['fact_value'],
+                'evidence_count': (previous['evidence_count'] if previous else 0) + fact_data.get('evidence_count', 1)
+            }
+        
+        insert = UPSERT_INSERTS.get(self.session.get_bind().dialect.name)
+        if insert is None:
+            stored = self._upsert_facts_by_lookup(merged)
         else:
-            # Create new fact
-            fact = LearnedFact(
-                user_id=user_id,
-                category=category,
-                fact_type=fact_type,
-                fact_key=fact_key,
-                fact_value=fact_value,
-                **kwargs
+            stmt = insert(LearnedFact)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'category', 'fact_key'],
+                set_={
+                    'fact_value': stmt.excluded.fact_value,
+                    'evidence_count': func.coalesce(LearnedFact.evidence_count, 1) + stmt.excluded.evidence_count,
+                    'last_updated': stmt.excluded.last_updated
+                }
             )
-            self.session.add(fact)
-            return fact
+            stored = self.session.scalars(
+                stmt.returning(LearnedFact, sort_by_parameter_order=True),
+                list(merged.values()),
+                execution_options={'populate_existing': True}
+            ).all()
+        
+        stored_by_key = dict(zip(merged, stored))
+        return [stored_by_key[(f['user_id'], f['category'], f['fact_key'])] for f in facts]
+    
+    def _upsert_facts_by_lookup(self, merged: Dict[Tuple[int, str, str], dict]) -> list[LearnedFact]:
+        """Upsert for other databases: look up existing facts in one query, then add or update"""
+        existing_facts = {
+            (fact.user_id, fact.category, fact.fact_key): fact
+            for fact in (self.session.query(LearnedFact)
+                         .filter(LearnedFact.user_id.in_({key[0] for key in merged}))
+                         .filter(LearnedFact.fact_key.in_({key[2] for key in merged}))
+                         .all())
+        }
+        
+        from datetime import datetime
+        now = datetime.utcnow()
+        stored = []
+        new_facts = []
+        for key, fact_data in merged.items():
+            fact = existing_facts.get(key)
+            if fact:
+                # Update existing fact
+                fact.fact_value = fact_data['fact_value']
+                fact.evidence_count = (fact.evidence_count or 1) + fact_data['evidence_count']
+                fact.last_updated = now
+            else:
+                # Create new fact
+                fact = LearnedFact(**fact_data)
+                new_facts.append(fact)
+            stored.append(fact)
+        
+        # Register all new facts at once; the flush sends them as one batched INSERT
+        self.session.add_all(new_facts)
+        return stored
     
-    def get_user_facts(self, user_id: int, category: Optional[str] = None) -> list[LearnedFact]:
+    def get_user_facts(self, user_id: int, category: Union[str, List[str], None] = None) -> list[LearnedFact]:
         """Get learned facts for a user"""
-        query = self.session.query(LearnedFact).filter(LearnedFact.user_id == user_id)
-        if category:
+        query = self.session.query(LearnedFact)
+        return self._filter_user_facts(query, user_id, category).all()
+    
+    def get_user_fact_rows(self, user_id: int, category: Union[str, List[str], None] = None,
+                           limit: Optional[int] = None,
+                           confidence_levels: Optional[List[str]] = None) -> list[Row]:
+        """Like get_user_facts, but returns plain rows of the listed columns
+        
+        confidence_levels and limit are applied in the query, so only the
+        rows returned are ever loaded.
+        """
+        query = self.session.query(
+            LearnedFact.id,
+            LearnedFact.category,
+            LearnedFact.fact_type,
+            LearnedFact.fact_key,
+            LearnedFact.fact_value,
+            LearnedFact.confidence_level,
+            LearnedFact.evidence_count,
+            LearnedFact.first_observed,
+            LearnedFact.last_updated,
+            LearnedFact.user_confirmed,
+            LearnedFact.learning_method
+        )
+        return self._filter_user_facts(query, user_id, category, confidence_levels).limit(limit).all()
+    
+    @staticmethod
+    def _filter_user_facts(query, user_id: int, category: Union[str, List[str], None],
+                           confidence_levels: Optional[List[str]] = None):
+        query = query.filter(LearnedFact.user_id == user_id)
+        if isinstance(category, (list, tuple)):
+            query = query.filter(LearnedFact.category.in_(category))
+        elif category:
             query = query.filter(LearnedFact.category == category)
-        return query.order_by(LearnedFact.confidence_level.desc(), LearnedFact.evidence_count.desc()).all()
+        if confidence_levels is not None:
+            query = query.filter(LearnedFact.confidence_level.in_(confidence_levels))
+        return query.order_by(LearnedFact.confidence_level.desc(), LearnedFact.evidence_count.desc())
+    
+    def get_fact_stats(self, user_id: int) -> Tuple[int, Optional[int]]:
+        """Get the fact count and newest fact ID for a user, a cheap change marker"""
+        return tuple(self.session.query(func.count(LearnedFact.id), func.max(LearnedFact.id))
+                     .filter(LearnedFact.user_id == user_id)
+                     .one())
+    
+    def count_facts_by_category_and_confidence(self, user_id: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Count a user's learned facts per category and per confidence level
+        
+        Both come from one GROUP BY over (category, confidence_level), which
+        returns only a handful of rows however many facts there are.
+        """
+        by_category = Counter()
+        by_confidence = Counter()
+        for category, confidence_level, count in (
+                self.session.query(LearnedFact.category, LearnedFact.confidence_level, func.count(LearnedFact.id))
+                .filter(LearnedFact.user_id == user_id)
+                .group_by(LearnedFact.category, LearnedFact.confidence_level)):
+            by_category[category] += count
+            by_confidence[confidence_level] += count
+        return dict(by_category), dict(by_confidence)
     
     def confirm_fact(self, fact_id: int, confirmed: bool = True):
         """Mark a fact as confirmed or rejected by the user"""
-        fact = self.session.query(LearnedFact).filter(LearnedFact.id == fact_id).first()
+        fact = self.session.get(LearnedFact, fact_id)
         if fact:
             fact.user_confirmed = confirmed
             fact.user_rejected = not confirmed
\ No newline at end of file
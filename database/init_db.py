@@ -11,7 +11,7 @@ from pathlib import Path
 # Add the parent directory to the path so we can import our modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from database import init_database, db_manager
+from database import init_database, get_db_manager
 from models import User, UserProfile
 
 # Configure logging
@@ -24,7 +24,7 @@ def create_sample_data():
     logger.info("Creating sample data...")
     
     try:
-        with db_manager.get_session() as session:
+        with get_db_manager().get_session() as session:
             from database import UserRepository
             
             user_repo = UserRepository(session)
@@ -75,7 +75,7 @@ def main():
         init_database()
         
         # Check database health
-        if db_manager.health_check():
+        if get_db_manager().health_check():
             logger.info("Database health check passed!")
         else:
             logger.error("Database health check failed!")
@@ -3,106 +3,356 @@ Basic API usage examples for the AI User Learning System
 """
 
 import requests
+import hashlib
 import json
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configuration
 BASE_URL = 'http://localhost:5000'
 API_BASE = f'{BASE_URL}/api'
 
+# Keep-alive connections per host, enough for concurrent callers sharing a client
+HTTP_POOL_SIZE = 16
+
+# urllib3 only decodes brotli responses when the brotli package is installed
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+# Repeat GETs within this window are answered from the client-side cache
+GET_CACHE_TTL = 5
+GET_CACHE_MAX_SIZE = 512
+
+# Interactions already sent by this client; identical re-sends are skipped
+RECORDED_INTERACTIONS_MAX_SIZE = 1024
+
+# Concurrent single-interaction POSTs when a server lacks the batch endpoint
+FALLBACK_RECORD_WORKERS = 8
+
+# GET responses larger than this are refused rather than buffered and parsed
+MAX_RESPONSE_BYTES = 8 * 1024 * 1024
+
+# One keep-alive pool for every client in the process. Sessions and the
+# client-side caches are not thread-safe, but urllib3's pool manager is, so
+# each thread gets its own APIClient (see get_client) mounting this adapter.
+# Only idempotent methods (the Retry default) are retried after a response,
+# so a POST that reached the server is never sent twice
+SHARED_ADAPTER = HTTPAdapter(
+    pool_maxsize=HTTP_POOL_SIZE,
+    max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[429, 502, 503, 504])
+)
+
 class APIClient:
-    """Simple API client for the AI Learning System"""
+    """Simple API client for the AI Learning System
+    
+    A client is meant for one thread; use get_client() to get the calling
+    thread's client.
+    """
     
-    def __init__(self, base_url=API_BASE):
+    def __init__(self, base_url=API_BASE, adapter=SHARED_ADAPTER):
         self.base_url = base_url
         self.session = requests.Session()
-        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session.headers.update({
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Content-Type': 'application/json'
+        })
+        
+        # Reuse pooled connections and retry transient failures with backoff
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # user id -> the user's base URL, built once per user
+        self._user_urls = {}
+        # (url, params) -> (expiry, data); mutating calls drop the user's entries
+        self._get_cache = {}
+        # (url, params) -> (etag, data), revalidated with If-None-Match once
+        # the TTL entry has expired or been dropped
+        self._etags = {}
+        # interaction digest -> interaction id, oldest first
+        self._recorded_interactions = OrderedDict()
+    
+    @staticmethod
+    def _encode(payload):
+        """Serialize a request body, with orjson when it is installed"""
+        return orjson.dumps(payload) if orjson else json.dumps(payload)
+    
+    @staticmethod
+    def _decode(body):
+        return orjson.loads(body) if orjson else json.loads(body)
+    
+    @staticmethod
+    def _read_body(response):
+        """Read a streamed response body, refusing one over MAX_RESPONSE_BYTES"""
+        # Content-Length is the compressed size, so also count decoded bytes
+        body = bytearray()
+        if int(response.headers.get('Content-Length', 0)) <= MAX_RESPONSE_BYTES:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body += chunk
+                if len(body) > MAX_RESPONSE_BYTES:
+                    break
+            else:
+                return bytes(body)
+        raise ValueError(f'Response from {response.url} exceeds {MAX_RESPONSE_BYTES} bytes')
+    
+    def _cached_get(self, url, params=None):
+        """GET a JSON resource, reusing a response fetched within GET_CACHE_TTL
+        
+        Older responses are revalidated with their ETag, so an unchanged
+        resource comes back as a bodiless 304.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        cached = self._get_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        tagged = self._etags.get(key)
+        headers = {'If-None-Match': tagged[0]} if tagged else None
+        with self.session.get(url, params=params, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            body = self._read_body(response)
+        if response.status_code == 304 and tagged:
+            data = tagged[1]
+        else:
+            data = self._decode(body)
+            if response.headers.get('ETag'):
+                self._store(self._etags, key, (response.headers['ETag'], data))
+        
+        self._store(self._get_cache, key, (time.monotonic() + GET_CACHE_TTL, data))
+        return data
+    
+    @staticmethod
+    def _store(cache, key, entry):
+        if key not in cache and len(cache) >= GET_CACHE_MAX_SIZE:
+            cache.pop(next(iter(cache)), None)
+        cache[key] = entry
+    
+    def _user_url(self, user_id):
+        user_url = self._user_urls.get(user_id)
+        if user_url is None:
+            user_url = f'{self.base_url}/users/{user_id}'
+            self._store(self._user_urls, user_id, user_url)
+        return user_url
+    
+    def _invalidate(self, user_id):
+        """Drop cached GETs for a user after a change to their data"""
+        user_url = self._user_url(user_id)
+        for key in list(self._get_cache):
+            if key[0] == user_url or key[0].startswith(f'{user_url}/'):
+                self._get_cache.pop(key, None)
+    
+    @staticmethod
+    def _interaction_digest(user_id, content, interaction_type):
+        return hashlib.blake2b(f'{user_id}\0{interaction_type}\0{content}'.encode(), digest_size=16).digest()
+    
+    def _remember_interaction(self, digest, interaction_id):
+        self._recorded_interactions[digest] = interaction_id
+        if len(self._recorded_interactions) > RECORDED_INTERACTIONS_MAX_SIZE:
+            self._recorded_interactions.popitem(last=False)
     
     def create_user(self, username, email=None, **kwargs):
         """Create a new user"""
         data = {'username': username, 'email': email, **kwargs}
-        response = self.session.post(f'{self.base_url}/users', json=data)
+        response = self.session.post(f'{self.base_url}/users', data=self._encode(data))
         response.raise_for_status()
-        return response.json()
+        return self._decode(response.content)
     
     def get_user(self, user_id):
         """Get user information"""
-        response = self.session.get(f'{self.base_url}/users/{user_id}')
-        response.raise_for_status()
-        return response.json()
+        return self._cached_get(self._user_url(user_id))
     
     def update_user_profile(self, user_id, profile_data):
         """Update user profile"""
-        response = self.session.put(f'{self.base_url}/users/{user_id}/profile', json=profile_data)
+        self._invalidate(user_id)
+        response = self.session.put(f'{self._user_url(user_id)}/profile', data=self._encode(profile_data))
         response.raise_for_status()
-        return response.json()
+        return self._decode(response.content)
     
     def record_interaction(self, user_id, content, interaction_type='message', **kwargs):
-        """Record a user interaction"""
+        """Record a user interaction, skipping one this client already sent"""
+        digest = self._interaction_digest(user_id, content, interaction_type)
+        if digest in self._recorded_interactions:
+            return {'interaction_id': self._recorded_interactions[digest], 'duplicate': True}
+        
         data = {
             'type': interaction_type,
             'content': content,
             'source': 'api_client',
             **kwargs
         }
-        response = self.session.post(f'{self.base_url}/users/{user_id}/interactions', json=data)
+        self._invalidate(user_id)
+        response = self.session.post(f'{self._user_url(user_id)}/interactions', data=self._encode(data))
         response.raise_for_status()
-        return response.json()
+        result = self._decode(response.content)
+        self._remember_interaction(digest, result['interaction_id'])
+        return result
+    
+    def record_interactions(self, user_id, items):
+        """Record several interactions in one request
+        
+        Each item is a dict with 'content' and optionally 'type'. Items this
+        client already sent are not sent again. Falls back to one request per
+        item, sent concurrently, against servers without the batch endpoint.
+        """
+        items = [{'type': 'message', 'source': 'api_client', **item} for item in items]
+        digests = [self._interaction_digest(user_id, item['content'], item['type']) for item in items]
+        interaction_ids = {digest: self._recorded_interactions[digest]
+                           for digest in digests if digest in self._recorded_interactions}
+        new_items = {digest: item for digest, item in zip(digests, items) if digest not in interaction_ids}
+        
+        if new_items:
+            self._invalidate(user_id)
+            response = self.session.post(f'{self._user_url(user_id)}/interactions/batch',
+                                         data=self._encode({'interactions': list(new_items.values())}))
+            if response.status_code == 404:
+                # Each worker thread sends through its own client; the ids are
+                # remembered here, on the calling thread
+                with ThreadPoolExecutor(max_workers=min(len(new_items), FALLBACK_RECORD_WORKERS)) as executor:
+                    results = executor.map(
+                        lambda item: get_client(self.base_url).record_interaction(
+                            user_id, item.pop('content'), item.pop('type'), **item),
+                        new_items.values())
+                    for digest, result in zip(new_items, results):
+                        self._remember_interaction(digest, result['interaction_id'])
+                        interaction_ids[digest] = result['interaction_id']
+            else:
+                response.raise_for_status()
+                for digest, interaction_id in zip(new_items, self._decode(response.content)['interaction_ids']):
+                    self._remember_interaction(digest, interaction_id)
+                    interaction_ids[digest] = interaction_id
+        
+        return {
+            'interaction_ids': [interaction_ids[digest] for digest in digests],
+            'count': len(new_items),
+            'duplicates': len(items) - len(new_items)
+        }
     
     def get_interactions(self, user_id, limit=50, offset=0):
         """Get user interactions"""
         params = {'limit': limit, 'offset': offset}
-        response = self.session.get(f'{self.base_url}/users/{user_id}/interactions', params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._cached_get(f'{self._user_url(user_id)}/interactions', params)
     
-    def trigger_learning(self, user_id):
-        """Trigger learning process for a user"""
-        response = self.session.post(f'{self.base_url}/users/{user_id}/learn')
+    def trigger_learning(self, user_id, include=('facts',), limit=None):
+        """Trigger learning process for a user
+        
+        With 'facts' in include, the result carries the user's learned facts
+        (at most limit), fetched separately from servers that don't return them.
+        """
+        params = {}
+        if include:
+            params['include'] = ','.join(include)
+        if limit:
+            params['limit'] = limit
+        self._invalidate(user_id)
+        response = self.session.post(f'{self._user_url(user_id)}/learn', params=params)
         response.raise_for_status()
-        return response.json()
+        result = self._decode(response.content)
+        if 'facts' in include and 'facts' not in result:
+            result['facts'] = self.get_learned_facts(user_id, limit=limit)['facts']
+        return result
     
-    def get_learned_facts(self, user_id, category=None):
-        """Get learned facts about a user"""
-        params = {'category': category} if category else {}
-        response = self.session.get(f'{self.base_url}/users/{user_id}/facts', params=params)
-        response.raise_for_status()
-        return response.json()
+    def get_learned_facts(self, user_id, category=None, categories=None, limit=None):
+        """Get learned facts about a user, for one category or a list of categories
+        
+        Pass limit when only the first few facts are needed, so the server
+        never loads or sends the rest.
+        """
+        params = {}
+        if category:
+            params['category'] = category
+        if categories:
+            params['categories'] = ','.join(categories)
+        if limit:
+            params['limit'] = limit
+        return self._cached_get(f'{self._user_url(user_id)}/facts', params)
     
     def confirm_fact(self, user_id, fact_id, confirmed=True):
         """Confirm or reject a learned fact"""
         data = {'confirmed': confirmed}
-        response = self.session.post(f'{self.base_url}/users/{user_id}/facts/{fact_id}/confirm', json=data)
+        self._invalidate(user_id)
+        response = self.session.post(f'{self._user_url(user_id)}/facts/{fact_id}/confirm', data=self._encode(data))
         response.raise_for_status()
-        return response.json()
+        return self._decode(response.content)
     
     def get_analytics(self, user_id):
         """Get user analytics"""
-        response = self.session.get(f'{self.base_url}/users/{user_id}/analytics')
-        response.raise_for_status()
-        return response.json()
+        return self._cached_get(f'{self._user_url(user_id)}/analytics')
     
     def health_check(self):
         """Check system health"""
-        response = self.session.get(f'{self.base_url.replace("/api", "")}/health')
-        response.raise_for_status()
-        return response.json()
+        return self._cached_get(f'{self.base_url.replace("/api", "")}/health')
+
+
+_thread_clients = threading.local()
+
 
+def get_client(base_url=API_BASE):
+    """The calling thread's client for base_url
+    
+    Clients are never shared between threads; they all reuse the
+    connections of SHARED_ADAPTER.
+    """
+    clients = getattr(_thread_clients, 'clients', None)
+    if clients is None:
+        clients = _thread_clients.clients = {}
+    client = clients.get(base_url)
+    if client is None:
+        client = clients[base_url] = APIClient(base_url)
+    return client
 
-def example_1_basic_workflow():
+
+def learning_summary(learning_result, recorded):
+    """Describe a /learn result for interactions just recorded in a batch
+    
+    Recording a batch also queues learning on the server. /learn only counts
+    the interactions it claimed itself, so whatever the background task got
+    to first is reported separately rather than as a failure to learn.
+    """
+    processed = learning_result['processed_interactions']
+    lines = [f"   Processed: {processed} interactions",
+             f"   Learned: {learning_result['new_facts']} new facts"]
+    if processed < recorded:
+        lines.append(f"   Already learned in the background: {recorded - processed} interactions")
+    return lines
+
+
+BASIC_WORKFLOW_INTERACTIONS = (
+    "Hi there! I'm new here and excited to learn.",
+    "I really enjoy programming in Python and JavaScript.",
+    "I prefer detailed explanations when learning new concepts.",
+    "Thanks for helping me understand this better!",
+    "I'm working on a machine learning project right now."
+)
+
+
+def example_1_basic_workflow(client=None):
     """Example 1: Basic workflow - create user, interact, learn"""
-    print("🚀 Example 1: Basic Workflow")
-    print("=" * 40)
+    client = client or get_client()
+    lines = []
+    out = lines.append
     
-    client = APIClient()
+    out("🚀 Example 1: Basic Workflow")
+    out("=" * 40)
     
     # Check system health
     health = client.health_check()
-    print(f"System Status: {health['status']}")
+    out(f"System Status: {health['status']}")
     
     # Create a user
-    print("\n1. Creating user...")
+    out("\n1. Creating user...")
     user = client.create_user(
         username=f"test_user_{int(time.time())}",
         email="test@example.com",
@@ -110,45 +360,36 @@ def example_1_basic_workflow():
         learning_enabled=True
     )
     user_id = user['user_id']
-    print(f"   Created user: {user['username']} (ID: {user_id})")
+    out(f"   Created user: {user['username']} (ID: {user_id})")
     
     # Record some interactions
-    print("\n2. Recording interactions...")
-    interactions = [
-        "Hi there! I'm new here and excited to learn.",
-        "I really enjoy programming in Python and JavaScript.",
-        "I prefer detailed explanations when learning new concepts.",
-        "Thanks for helping me understand this better!",
-        "I'm working on a machine learning project right now."
-    ]
-    
-    for i, content in enumerate(interactions, 1):
-        result = client.record_interaction(user_id, content)
-        print(f"   {i}. Recorded: '{content[:50]}...'")
-        time.sleep(0.5)  # Small delay between interactions
+    out("\n2. Recording interactions...")
+    client.record_interactions(user_id, [{'content': content} for content in BASIC_WORKFLOW_INTERACTIONS])
+    for i, content in enumerate(BASIC_WORKFLOW_INTERACTIONS, 1):
+        out(f"   {i}. Recorded: '{content[:50]}...'")
     
     # Trigger learning
-    print("\n3. Triggering AI learning...")
-    learning_result = client.trigger_learning(user_id)
-    print(f"   Processed: {learning_result['processed_interactions']} interactions")
-    print(f"   Learned: {learning_result['new_facts']} new facts")
-    print(f"   Time: {learning_result['processing_time_ms']}ms")
+    out("\n3. Triggering AI learning...")
+    learning_result = client.trigger_learning(user_id, limit=5)  # Show first 5 facts
+    lines.extend(learning_summary(learning_result, len(BASIC_WORKFLOW_INTERACTIONS)))
+    out(f"   Time: {learning_result.get('processing_time_ms', 0)}ms")
     
-    # Get learned facts
-    print("\n4. Retrieved learned facts:")
-    facts = client.get_learned_facts(user_id)
-    for fact in facts['facts'][:5]:  # Show first 5 facts
-        print(f"   • {fact['category']}: {fact['fact_value']} (Confidence: {fact['confidence_level']})")
+    # Learned facts come back with the learning result
+    out("\n4. Retrieved learned facts:")
+    for fact in learning_result['facts']:
+        out(f"   • {fact['category']}: {fact['fact_value']} (Confidence: {fact['confidence_level']})")
     
-    return user_id
+    return user_id, lines
 
 
-def example_2_profile_management():
+def example_2_profile_management(client=None):
     """Example 2: Profile management and preferences"""
-    print("\n🔧 Example 2: Profile Management")
-    print("=" * 40)
+    client = client or get_client()
+    lines = []
+    out = lines.append
     
-    client = APIClient()
+    out("\n🔧 Example 2: Profile Management")
+    out("=" * 40)
     
     # Create user
     user = client.create_user(
@@ -156,10 +397,10 @@ def example_2_profile_management():
         email="profile@example.com"
     )
     user_id = user['user_id']
-    print(f"Created user: {user['username']}")
+    out(f"Created user: {user['username']}")
     
     # Update profile
-    print("\n1. Updating user profile...")
+    out("\n1. Updating user profile...")
     profile_data = {
         'preferred_language': 'en',
         'communication_style': 'professional',
@@ -170,178 +411,201 @@ def example_2_profile_management():
     }
     
     client.update_user_profile(user_id, profile_data)
-    print("   Profile updated successfully")
+    out("   Profile updated successfully")
     
     # Get updated user info
-    print("\n2. Retrieving updated user info...")
+    out("\n2. Retrieving updated user info...")
     user_info = client.get_user(user_id)
     profile = user_info.get('profile', {})
-    print(f"   Language: {profile.get('preferred_language')}")
-    print(f"   Style: {profile.get('communication_style')}")
-    print(f"   Level: {profile.get('technical_level')}")
-    print(f"   Interests: {', '.join(profile.get('interests', []))}")
+    out(f"   Language: {profile.get('preferred_language')}")
+    out(f"   Style: {profile.get('communication_style')}")
+    out(f"   Level: {profile.get('technical_level')}")
+    out(f"   Interests: {', '.join(profile.get('interests', []))}")
     
-    return user_id
+    return user_id, lines
 
 
-def example_3_interaction_analysis():
+INTERACTION_SCENARIOS = (
+    # Preferences
+    ('preference', "I love learning about machine learning algorithms"),
+    ('preference', "I prefer visual explanations over text-heavy content"),
+    ('preference', "I don't like overly technical jargon when starting to learn something"),
+    
+    # Feedback
+    ('feedback', "That explanation was perfect - just the right level of detail!"),
+    ('feedback', "Could you provide more examples next time?"),
+    ('feedback', "I found that too advanced, please simplify"),
+    
+    # Behavior
+    ('behavior', "I usually study best in the morning"),
+    ('behavior', "I like to take breaks every 30 minutes when learning"),
+    ('behavior', "I prefer interactive content over passive reading"),
+    
+    # Messages
+    ('message', "How does gradient descent work in neural networks?"),
+    ('message', "Can you explain the difference between supervised and unsupervised learning?"),
+    ('message', "Thank you for the detailed explanation!")
+)
+
+
+def example_3_interaction_analysis(client=None):
     """Example 3: Different types of interactions and analysis"""
-    print("\n📊 Example 3: Interaction Analysis")
-    print("=" * 40)
+    client = client or get_client()
+    lines = []
+    out = lines.append
     
-    client = APIClient()
+    out("\n📊 Example 3: Interaction Analysis")
+    out("=" * 40)
     
     # Create user
     user = client.create_user(username=f"analysis_user_{int(time.time())}")
     user_id = user['user_id']
-    print(f"Created user for analysis")
+    out(f"Created user for analysis")
     
     # Record different types of interactions
-    interaction_scenarios = [
-        # Preferences
-        ('preference', "I love learning about machine learning algorithms"),
-        ('preference', "I prefer visual explanations over text-heavy content"),
-        ('preference', "I don't like overly technical jargon when starting to learn something"),
-        
-        # Feedback
-        ('feedback', "That explanation was perfect - just the right level of detail!"),
-        ('feedback', "Could you provide more examples next time?"),
-        ('feedback', "I found that too advanced, please simplify"),
-        
-        # Behavior
-        ('behavior', "I usually study best in the morning"),
-        ('behavior', "I like to take breaks every 30 minutes when learning"),
-        ('behavior', "I prefer interactive content over passive reading"),
-        
-        # Messages
-        ('message', "How does gradient descent work in neural networks?"),
-        ('message', "Can you explain the difference between supervised and unsupervised learning?"),
-        ('message', "Thank you for the detailed explanation!")
-    ]
-    
-    print(f"\n1. Recording {len(interaction_scenarios)} different interactions...")
-    for interaction_type, content in interaction_scenarios:
-        client.record_interaction(user_id, content, interaction_type)
-        print(f"   {interaction_type}: '{content[:50]}...'")
-        time.sleep(0.3)
+    out(f"\n1. Recording {len(INTERACTION_SCENARIOS)} different interactions...")
+    client.record_interactions(user_id, [
+        {'type': interaction_type, 'content': content}
+        for interaction_type, content in INTERACTION_SCENARIOS
+    ])
+    for interaction_type, content in INTERACTION_SCENARIOS:
+        out(f"   {interaction_type}: '{content[:50]}...'")
     
     # Trigger learning
-    print("\n2. Processing interactions with AI...")
+    out("\n2. Processing interactions with AI...")
     learning_result = client.trigger_learning(user_id)
-    print(f"   Learning completed: {learning_result['new_facts']} facts learned")
+    lines.extend(learning_summary(learning_result, len(INTERACTION_SCENARIOS)))
     
     # Analyze learned facts by category
-    print("\n3. Analyzing learned facts by category...")
+    out("\n3. Analyzing learned facts by category...")
     categories = ['preferences', 'behavior', 'communication', 'interests']
     
-    for category in categories:
-        facts = client.get_learned_facts(user_id, category)
-        if facts['facts']:
-            print(f"\n   {category.upper()}:")
-            for fact in facts['facts']:
-                print(f"     • {fact['fact_key']}: {fact['fact_value']}")
+    # Group the facts returned with the learning result
+    facts_by_category = {category: [] for category in categories}
+    for fact in learning_result['facts']:
+        if fact['category'] in facts_by_category:
+            facts_by_category[fact['category']].append(fact)
+    
+    for category, facts in facts_by_category.items():
+        if facts:
+            out(f"\n   {category.upper()}:")
+            lines.extend(f"     • {fact['fact_key']}: {fact['fact_value']}" for fact in facts)
         else:
-            print(f"\n   {category.upper()}: No facts learned yet")
+            out(f"\n   {category.upper()}: No facts learned yet")
     
-    return user_id
+    return user_id, lines
 
 
-def example_4_fact_confirmation():
+FACT_CONFIRMATION_INTERACTIONS = (
+    "I absolutely love working with Python for data analysis",
+    "I'm passionate about renewable energy and sustainability",
+    "I prefer working alone rather than in teams",
+    "I find mathematics fascinating, especially statistics"
+)
+
+
+def example_4_fact_confirmation(client=None):
     """Example 4: Fact confirmation and user feedback"""
-    print("\n✅ Example 4: Fact Confirmation")
-    print("=" * 40)
+    client = client or get_client()
+    lines = []
+    out = lines.append
     
-    client = APIClient()
+    out("\n✅ Example 4: Fact Confirmation")
+    out("=" * 40)
     
     # Use user from previous example or create new one
     user = client.create_user(username=f"confirm_user_{int(time.time())}")
     user_id = user['user_id']
     
     # Record some interactions
-    interactions = [
-        "I absolutely love working with Python for data analysis",
-        "I'm passionate about renewable energy and sustainability",
-        "I prefer working alone rather than in teams",
-        "I find mathematics fascinating, especially statistics"
-    ]
-    
-    print("1. Recording interactions...")
-    for content in interactions:
-        client.record_interaction(user_id, content, 'preference')
-        print(f"   Recorded: '{content[:50]}...'")
+    out("1. Recording interactions...")
+    client.record_interactions(user_id, [{'type': 'preference', 'content': content}
+                                         for content in FACT_CONFIRMATION_INTERACTIONS])
+    for content in FACT_CONFIRMATION_INTERACTIONS:
+        out(f"   Recorded: '{content[:50]}...'")
     
-    # Trigger learning
-    client.trigger_learning(user_id)
+    # Trigger learning; the first 3 facts come back with the result
+    facts = client.trigger_learning(user_id, limit=3)['facts']
     
     # Get facts and demonstrate confirmation
-    print("\n2. Reviewing and confirming learned facts...")
-    facts = client.get_learned_facts(user_id)
-    
-    for i, fact in enumerate(facts['facts'][:3]):  # Confirm first 3 facts
-        print(f"\n   Fact {i+1}: {fact['fact_value']}")
-        print(f"   Confidence: {fact['confidence_level']}")
-        
-        # Simulate user confirmation (in real app, this would be user input)
-        confirmed = i < 2  # Confirm first 2, reject the 3rd
-        result = client.confirm_fact(user_id, fact['id'], confirmed)
+    out("\n2. Reviewing and confirming learned facts...")
+    
+    # Simulate user confirmation (in real app, this would be user input):
+    # confirm the first 2, reject the 3rd. The confirmations are independent,
+    # so send them concurrently, each worker thread through its own client
+    decisions = [i < 2 for i in range(len(facts))]
+    with ThreadPoolExecutor(max_workers=max(len(facts), 1)) as executor:
+        list(executor.map(
+            lambda fact, confirmed: get_client(client.base_url).confirm_fact(user_id, fact['id'], confirmed),
+            facts, decisions))
+    
+    for i, (fact, confirmed) in enumerate(zip(facts, decisions)):
+        out(f"\n   Fact {i+1}: {fact['fact_value']}")
+        out(f"   Confidence: {fact['confidence_level']}")
         
         status = "✅ CONFIRMED" if confirmed else "❌ REJECTED"
-        print(f"   User feedback: {status}")
+        out(f"   User feedback: {status}")
     
-    return user_id
+    return user_id, lines
+
 
+DAILY_INTERACTIONS = (
+    # Day 1
+    ("Good morning! Ready to learn something new today.", "I'm interested in machine learning basics."),
+    # Day 2
+    ("Can you explain neural networks in simple terms?", "That was helpful, thank you!"),
+    # Day 3
+    ("I prefer step-by-step explanations.", "Visual aids really help me understand better."),
+    # Day 4
+    ("I'm working on a Python project now.", "Could you recommend some good resources?"),
+    # Day 5
+    ("I love how patient you are with my questions.", "This learning approach really works for me.")
+)
 
-def example_5_analytics_dashboard():
+
+def example_5_analytics_dashboard(client=None):
     """Example 5: Analytics and insights"""
-    print("\n📈 Example 5: Analytics Dashboard")
-    print("=" * 40)
+    client = client or get_client()
+    lines = []
+    out = lines.append
     
-    client = APIClient()
+    out("\n📈 Example 5: Analytics Dashboard")
+    out("=" * 40)
     
     # Create user with substantial interaction history
     user = client.create_user(username=f"analytics_user_{int(time.time())}")
     user_id = user['user_id']
     
     # Simulate a week of interactions
-    daily_interactions = [
-        # Day 1
-        ["Good morning! Ready to learn something new today.", "I'm interested in machine learning basics."],
-        # Day 2
-        ["Can you explain neural networks in simple terms?", "That was helpful, thank you!"],
-        # Day 3
-        ["I prefer step-by-step explanations.", "Visual aids really help me understand better."],
-        # Day 4
-        ["I'm working on a Python project now.", "Could you recommend some good resources?"],
-        # Day 5
-        ["I love how patient you are with my questions.", "This learning approach really works for me."]
-    ]
-    
-    print("1. Simulating interaction history...")
-    for day, interactions in enumerate(daily_interactions, 1):
-        print(f"   Day {day}: {len(interactions)} interactions")
-        for content in interactions:
-            client.record_interaction(user_id, content)
-        time.sleep(0.5)
+    out("1. Simulating interaction history...")
+    client.record_interactions(user_id, [
+        {'content': content}
+        for interactions in DAILY_INTERACTIONS
+        for content in interactions
+    ])
+    for day, interactions in enumerate(DAILY_INTERACTIONS, 1):
+        out(f"   Day {day}: {len(interactions)} interactions")
     
     # Trigger learning
-    print("\n2. Processing all interactions...")
-    client.trigger_learning(user_id)
+    out("\n2. Processing all interactions...")
+    client.trigger_learning(user_id, include=())
     
     # Get analytics
-    print("\n3. Generating analytics report...")
+    out("\n3. Generating analytics report...")
     analytics = client.get_analytics(user_id)
     
-    print(f"\n📊 USER ANALYTICS REPORT")
-    print(f"   Total Interactions: {analytics['user_summary']['total_interactions']}")
-    print(f"   Facts Learned: {analytics['user_summary']['total_facts_learned']}")
-    print(f"   Average Sentiment: {analytics['interaction_stats']['average_sentiment']:.2f}")
-    print(f"   Member Since: {analytics['user_summary']['member_since'][:10]}")
-    
-    print(f"\n🧠 LEARNING PROGRESS:")
-    for category, count in analytics['learning_progress']['facts_by_category'].items():
-        print(f"   {category.title()}: {count} facts")
-    
-    return user_id
+    lines.extend([
+        f"\n📊 USER ANALYTICS REPORT",
+        f"   Total Interactions: {analytics['user_summary']['total_interactions']}",
+        f"   Facts Learned: {analytics['user_summary']['total_facts_learned']}",
+        f"   Average Sentiment: {analytics['interaction_stats']['average_sentiment']:.2f}",
+        f"   Member Since: {analytics['user_summary']['member_since'][:10]}",
+        f"\n🧠 LEARNING PROGRESS:"
+    ])
+    lines.extend(f"   {category.title()}: {count} facts"
+                 for category, count in analytics['learning_progress']['facts_by_category'].items())
+    
+    return user_id, lines
 
 
 def run_all_examples():
@@ -350,21 +614,33 @@ def run_all_examples():
     print("=" * 60)
     print("This demonstrates the complete API functionality\n")
     
+    examples = [
+        example_1_basic_workflow,
+        example_2_profile_management,
+        example_3_interaction_analysis,
+        example_4_fact_confirmation,
+        example_5_analytics_dashboard
+    ]
+    
     try:
-        # Run all examples
-        user1 = example_1_basic_workflow()
-        user2 = example_2_profile_management()
-        user3 = example_3_interaction_analysis()
-        user4 = example_4_fact_confirmation()
-        user5 = example_5_analytics_dashboard()
+        # The examples use separate users and spend most of their time
+        # waiting on HTTP, so run them concurrently, each on its own thread's
+        # client; they return their output, which is printed in order
+        users = []
+        with ThreadPoolExecutor(max_workers=len(examples)) as executor:
+            futures = [executor.submit(example) for example in examples]
+            for future in futures:
+                user_id, lines = future.result()
+                print('\n'.join(lines))
+                users.append(user_id)
         
         print(f"\n🎉 All Examples Completed Successfully!")
         print(f"=" * 60)
-        print(f"Created {5} demo users with various interaction patterns")
+        print(f"Created {len(users)} demo users with various interaction patterns")
         print(f"Demonstrated: User creation, interactions, learning, facts, analytics")
         print(f"Check the web interface at: http://localhost:5000")
         
-        return [user1, user2, user3, user4, user5]
+        return users
         
     except requests.exceptions.ConnectionError:
         print("❌ Error: Could not connect to API server")
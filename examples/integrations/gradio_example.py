@@ -110,10 +110,7 @@ class LearningChatbot:
             # Facts by category
             categories = {}
             for fact in insights['facts']:
-                cat = fact['category']
-                if cat not in categories:
-                    categories[cat] = []
-                categories[cat].append(fact)
+                categories.setdefault(fact['category'], []).append(fact)
             
             for category, facts in categories.items():
                 output.append(f"\n### {category.title()}:")
@@ -108,10 +108,7 @@ class PersonalizedLMStudioChat:
             # Group facts by category
             categories = {}
             for fact in insights['facts']:
-                cat = fact['category']
-                if cat not in categories:
-                    categories[cat] = []
-                categories[cat].append(fact)
+                categories.setdefault(fact['category'], []).append(fact)
             
             for category, facts in categories.items():
                 summary.append(f"\n{category.title()}:")
@@ -148,6 +145,9 @@ class PersonalizedLMStudioChat:
             # Bulk upload to learning system
             result = self.sdk.bulk_upload(user_id, messages)
             print(f"Imported {result['interactions_created']} interactions")
+            if result.get('task_id'):
+                # Large uploads are learned in the background
+                result = self.sdk.wait_for_task(result['task_id'])
             print(f"Learned {result['facts_learned']} new facts")
             
         except Exception as e:
@@ -136,10 +136,7 @@ class PersonalizedOpenAIChat:
             # Group facts by category
             categories = {}
             for fact in insights['facts']:
-                cat = fact['category']
-                if cat not in categories:
-                    categories[cat] = []
-                categories[cat].append(fact)
+                categories.setdefault(fact['category'], []).append(fact)
             
             for category, facts in categories.items():
                 summary.append(f"\n{category.title()}:")
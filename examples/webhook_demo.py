@@ -16,6 +16,21 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from sdk import AIUserLearningSDK, ChatMessage
 
+# Chat messages are learned from in the background, so the demo polls for
+# learned facts for up to this many seconds before showing the insights
+LEARNING_WAIT_TIMEOUT = 10
+LEARNING_POLL_INTERVAL = 0.5
+
+
+def wait_for_insights(sdk, user_id, timeout=LEARNING_WAIT_TIMEOUT, poll_interval=LEARNING_POLL_INTERVAL):
+    """Poll a user's insights until learned facts show up or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    while True:
+        insights = sdk.get_user_insights(user_id, limit=10)
+        if insights.get('facts') or time.monotonic() >= deadline:
+            return insights
+        time.sleep(poll_interval)
+
 
 def demo_basic_integration():
     """Demo basic SDK integration"""
@@ -48,6 +63,7 @@ def demo_basic_integration():
     print("-" * 50)
     
     # Log each interaction
+    learning_queued = False
     for i, (user_msg, bot_response) in enumerate(conversation, 1):
         print(f"\nStep {i}/5: Logging interaction...")
         print(f"User: {user_msg}")
@@ -65,19 +81,22 @@ def demo_basic_integration():
             result = sdk.log_message(chat_msg)
             print(f"✅ Logged (interaction_id: {result.get('interaction_id')})")
             
-            if result.get('learned_facts_count', 0) > 0:
-                print(f"🧠 Learned {result['learned_facts_count']} new facts!")
+            if result.get('learning_queued'):
+                learning_queued = True
+                print("🧠 Learning queued in the background")
         
         except Exception as e:
             print(f"❌ Error: {e}")
-        
-        time.sleep(1)  # Small delay for demo effect
     
     print(f"\n📊 Getting insights for {user_id}...")
     
     # Get user insights
     try:
-        insights = sdk.get_user_insights(user_id, limit=10)
+        if learning_queued:
+            print("⏳ Waiting for background learning...")
+            insights = wait_for_insights(sdk, user_id)
+        else:
+            insights = sdk.get_user_insights(user_id, limit=10)
         
         print(f"\n🎯 User Profile Summary:")
         print(f"  Total interactions: {insights.get('analytics', {}).get('total_interactions', 0)}")
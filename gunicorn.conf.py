@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration for running the AI User Learning System in production
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+
+The Flask development server started by `python app.py` handles requests
+one worker at a time and is meant for local development only.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+
+# Threaded workers suit the synchronous SQLAlchemy data layer: request
+# threads overlap on database I/O without monkey patching. Set
+# GUNICORN_WORKER_CLASS=gevent (with gevent installed) for very high
+# connection counts, e.g. many long-lived SSE streams.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# SSE streams hold a request open, so allow long-running responses
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+# Keep DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW at or above `threads`
+# (plus LEARNING_WORKERS) so a worker never waits on its own pool.
+# The app is not preloaded: each worker creates its own engine and
+# background learning threads after the fork.
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Queue each worker's log records to a background thread"""
+    from app import start_log_listener
+    worker.log_listener = start_log_listener()
+
+
+def worker_exit(server, worker):
+    """Flush the worker's queued log records before it exits"""
+    log_listener = getattr(worker, 'log_listener', None)
+    if log_listener is not None:
+        log_listener.stop()
@@ -6,13 +6,17 @@ from datetime import datetime
 from enum import Enum
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import json
 
 Base = declarative_base()
 
+# JSON columns use PostgreSQL's binary JSONB type there, and plain JSON elsewhere
+JSONColumn = JSON().with_variant(JSONB(), 'postgresql')
+
 
 class InteractionType(Enum):
     """Types of user interactions"""
@@ -74,8 +78,8 @@ class UserProfile(Base):
     response_length_preference = Column(String(20))  # brief, detailed, comprehensive
     
     # Interests and hobbies (stored as JSON)
-    interests = Column(JSON)
-    hobbies = Column(JSON)
+    interests = Column(JSONColumn)
+    hobbies = Column(JSONColumn)
     
     # AI interaction preferences
     explanation_detail_level = Column(String(20), default="medium")  # low, medium, high
@@ -97,7 +101,7 @@ class UserInteraction(Base):
     
     interaction_type = Column(String(20), nullable=False)  # InteractionType enum
     content = Column(Text)  # The actual interaction content
-    context = Column(JSON)  # Additional context data
+    context = Column(JSONColumn)  # Additional context data
     
     # Metadata
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -106,12 +110,22 @@ class UserInteraction(Base):
     
     # Analysis results
     sentiment = Column(Float)  # -1 to 1
-    topics = Column(JSON)  # Extracted topics/keywords
+    topics = Column(JSONColumn)  # Extracted topics/keywords
     intent = Column(String(100))  # Classified intent
     processed = Column(Boolean, default=False)  # Has this been analyzed?
     
     # Relationships
     user = relationship("User", back_populates="interactions")
+    
+    __table_args__ = (
+        # Keyset pagination: WHERE user_id = ? AND id < ? ORDER BY id DESC
+        # and MAX(id) change checks
+        Index('ix_user_interactions_user_id_id', 'user_id', 'id'),
+        # Newest-first history: WHERE user_id = ? ORDER BY timestamp DESC
+        Index('ix_user_interactions_user_id_timestamp', 'user_id', 'timestamp'),
+        # Learning backlog: WHERE user_id = ? AND processed = false
+        Index('ix_user_interactions_user_id_processed', 'user_id', 'processed'),
+    )
 
 
 class LearnedFact(Base):
@@ -133,7 +147,7 @@ class LearnedFact(Base):
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Source tracking
-    source_interactions = Column(JSON)  # List of interaction IDs that led to this fact
+    source_interactions = Column(JSONColumn)  # List of interaction IDs that led to this fact
     learning_method = Column(String(50))  # explicit, pattern_analysis, nlp_extraction, etc.
     
     # Validation
@@ -142,6 +156,11 @@ class LearnedFact(Base):
     
     # Relationships
     user = relationship("User", back_populates="learned_facts")
+    
+    __table_args__ = (
+        # One row per fact, so writes can upsert with ON CONFLICT
+        UniqueConstraint('user_id', 'category', 'fact_key', name='uq_learned_facts_user_category_key'),
+    )
 
 
 class UserPreference(Base):
@@ -186,8 +205,8 @@ class LearningSession(Base):
     processing_time_ms = Column(Integer)
     
     # Results
-    learning_summary = Column(JSON)  # Summary of what was learned
-    errors = Column(JSON)  # Any errors encountered
+    learning_summary = Column(JSONColumn)  # Summary of what was learned
+    errors = Column(JSONColumn)  # Any errors encountered
 
 
 @dataclass
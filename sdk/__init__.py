@@ -165,7 +165,10 @@ class AIUserLearningSDK:
             messages: List of message strings
             
         Returns:
-            Bulk upload response with processing statistics
+            Bulk upload response with processing statistics. Uploads larger
+            than the server's learning chunk size are learned in the
+            background: the response then has a 'task_id' to pass to
+            wait_for_task(), and 'facts_learned' is None.
         """
         url = f"{self.base_url}/webhook/chat/bulk"
         
@@ -191,6 +194,48 @@ class AIUserLearningSDK:
             logger.error(f"Failed to bulk upload: {e}")
             raise
     
+    def get_task_status(self, task_id: str) -> Dict[str, Any]:
+        """
+        Get the progress of a background learning task
+        
+        Args:
+            task_id: Task ID returned by bulk_upload
+            
+        Returns:
+            Task status with 'status' (queued, running, completed or failed),
+            chunk progress and 'facts_learned' so far
+        """
+        url = f"{self.base_url}/webhook/tasks/{task_id}"
+        
+        try:
+            response = self.session.get(url)
+            response.raise_for_status()
+            return response.json()
+        
+        except requests.RequestException as e:
+            logger.error(f"Failed to get task status: {e}")
+            raise
+    
+    def wait_for_task(self, task_id: str, timeout: float = 300.0,
+                      poll_interval: float = 1.0) -> Dict[str, Any]:
+        """
+        Poll a background learning task until it completes or fails
+        
+        Args:
+            task_id: Task ID returned by bulk_upload
+            timeout: Seconds to wait before returning the last status seen
+            poll_interval: Seconds between polls
+            
+        Returns:
+            The final (or, on timeout, latest) task status
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.get_task_status(task_id)
+            if status['status'] in ('completed', 'failed') or time.monotonic() >= deadline:
+                return status
+            time.sleep(poll_interval)
+    
     def get_personalization_context(self, user_id: str) -> str:
         """
         Get a formatted string of user context for chatbot personalization
@@ -44,13 +44,17 @@ def initialize_database():
     """Initialize the database"""
     print("🗄️ Initializing database...")
     try:
-        from database import db_manager
+        from database import get_db_manager
+        db_manager = get_db_manager()
         
         # Create tables if they don't exist
         if not Path("user_learning.db").exists():
             db_manager.create_tables()
             print("✅ Database created and initialized")
         else:
+            # Bring tables and keys of an existing database up to date
+            db_manager.create_tables()
+            
             # Test connection
             if db_manager.health_check():
                 print("✅ Database connection verified")
@@ -0,0 +1,9 @@
+"""
+Shared pytest setup for the AI User Learning System test suite
+"""
+
+import os
+import sys
+
+# Make the top-level packages (app, ai, database, models) importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
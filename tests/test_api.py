@@ -0,0 +1,267 @@
+"""
+Tests for the REST and webhook endpoints, run against a temporary SQLite database
+"""
+
+import gzip
+import json
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+WEBHOOK_HEADERS = {'X-API-Key': 'dev-webhook-key-change-in-production'}
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # The database manager reads DATABASE_URL once, when it is first created
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    from database import get_db_manager
+    get_db_manager().create_tables()
+    
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    # Run background learning inline, so each test sees it finished
+    def submit_inline(func, *args):
+        func(*args)
+    
+    monkeypatch.setattr(app_module.learning_executor, 'submit', submit_inline)
+    # All requests share one webhook key, so start each test with fresh rate limits
+    app_module.rate_limit_store.clear()
+    return app_module.app.test_client()
+
+
+def create_user(client, username):
+    response = client.post('/api/users', json={'username': username})
+    assert response.status_code == 201
+    return response.get_json()['user_id']
+
+
+def record_interactions(client, user_id, contents):
+    response = client.post(f'/api/users/{user_id}/interactions/batch',
+                           json={'interactions': [{'content': content} for content in contents]})
+    assert response.status_code == 202
+    return response.get_json()['interaction_ids']
+
+
+def test_large_bulk_upload_is_learned_in_a_polled_task(client, app_module):
+    """Uploads over one chunk get a 202 with a task to poll for the facts learned."""
+    messages = [{'message': f"I love python and jazz, message {i}"}
+                for i in range(app_module.BULK_LEARNING_CHUNK_SIZE + 1)]
+    
+    response = client.post('/webhook/chat/bulk', headers=WEBHOOK_HEADERS,
+                           json={'user_id': 'bulk_user', 'interactions': messages})
+    
+    assert response.status_code == 202
+    upload = response.get_json()
+    assert upload['interactions_created'] == len(messages)
+    assert upload['facts_learned'] is None
+    
+    status = client.get(upload['status_url'], headers=WEBHOOK_HEADERS).get_json()
+    assert status['status'] == 'completed'
+    assert status['chunks_total'] == status['chunks_done'] == 2
+    assert status['facts_learned'] > 0
+    
+    # The task claimed every uploaded interaction
+    learned = client.post(f"/api/users/{upload['user_id']}/learn").get_json()
+    assert learned['processed_interactions'] == 0
+
+
+def test_unknown_task_is_not_found(client):
+    """Polling a task ID the server never issued is a 404."""
+    response = client.get('/webhook/tasks/missing', headers=WEBHOOK_HEADERS)
+    
+    assert response.status_code == 404
+
+
+def test_learn_does_not_count_interactions_learned_in_the_background(client):
+    """/learn only processes interactions background learning hasn't claimed."""
+    user_id = create_user(client, 'background_user')
+    record_interactions(client, user_id, ["I love hiking in the mountains",
+                                          "I prefer detailed explanations"])
+    facts = client.get(f'/api/users/{user_id}/facts').get_json()['facts']
+    
+    response = client.post(f'/api/users/{user_id}/learn', query_string={'include': 'facts'})
+    
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['processed_interactions'] == 0
+    assert result['new_facts'] == 0
+    assert result['facts'] == facts
+    
+    # A later batch is likewise learned once, by its background task
+    record_interactions(client, user_id, ["I enjoy reading science fiction"])
+    result = client.post(f'/api/users/{user_id}/learn').get_json()
+    assert result['processed_interactions'] == 0
+
+
+def test_learn_includes_facts_up_to_limit(client, app_module, monkeypatch):
+    """include=facts returns the user's facts with the learning result, capped by limit."""
+    # Leave the interactions for /learn to claim
+    monkeypatch.setattr(app_module.learning_executor, 'submit', lambda func, *args: None)
+    user_id = create_user(client, 'facts_user')
+    record_interactions(client, user_id, ["I love jazz music", "I like coding in Python",
+                                          "Can you explain recursion?"])
+    
+    result = client.post(f'/api/users/{user_id}/learn',
+                         query_string={'include': 'facts', 'limit': 1}).get_json()
+    
+    assert result['processed_interactions'] == 3
+    assert result['new_facts'] > 0
+    assert len(result['facts']) == 1
+    
+    without_facts = client.post(f'/api/users/{user_id}/learn').get_json()
+    assert 'facts' not in without_facts
+
+
+def test_interactions_page_with_before_id_cursor(client):
+    """next_cursor feeds before_id to page through interactions newest first."""
+    user_id = create_user(client, 'paging_user')
+    interaction_ids = record_interactions(client, user_id, [f"message {i}" for i in range(5)])
+    
+    pages = []
+    params = {'limit': 2}
+    while True:
+        page = client.get(f'/api/users/{user_id}/interactions', query_string=params).get_json()
+        pages.append([interaction['id'] for interaction in page['interactions']])
+        if page['next_cursor'] is None:
+            break
+        params['before_id'] = page['next_cursor']
+    
+    assert pages == [interaction_ids[:-3:-1], interaction_ids[-3:-5:-1], interaction_ids[:1]]
+
+
+def fact_evidence(client, user_id):
+    facts = client.get(f'/api/users/{user_id}/facts').get_json()['facts']
+    return {fact['fact_key']: fact['evidence_count'] for fact in facts}
+
+
+def test_chat_learning_counts_each_message_once(client, app_module, monkeypatch):
+    """Chat learning only learns from messages it claims, so evidence for a
+    fact stops growing once later messages no longer support it."""
+    def post_message(message):
+        response = client.post('/webhook/chat/message', headers=WEBHOOK_HEADERS,
+                               json={'user_id': 'chat_user', 'message': message})
+        assert response.status_code == 202
+        return response.get_json()['user_id']
+    
+    # Queue the first messages so one learning run sees all of them
+    with monkeypatch.context() as queued:
+        queued.setattr(app_module.learning_executor, 'submit', lambda func, *args: None)
+        queued.setattr(app_module, 'pending_learning_users', set())
+        for message in ["I love jazz music", "jazz concerts are fun", "more jazz please"]:
+            user_id = post_message(message)
+    app_module.learn_from_recent(user_id)
+    jazz_evidence = fact_evidence(client, user_id)['interest_jazz']
+    
+    for message in ["ok thanks", "sounds good", "see you later"]:
+        post_message(message)
+    
+    assert fact_evidence(client, user_id)['interest_jazz'] == jazz_evidence
+    assert client.post(f'/api/users/{user_id}/learn').get_json()['processed_interactions'] == 0
+
+
+def test_learning_stream_learns_each_interaction_once(client, app_module, monkeypatch):
+    """Reopening the learning stream doesn't learn from the same interactions again."""
+    # Leave the interactions for the stream to claim
+    monkeypatch.setattr(app_module.learning_executor, 'submit', lambda func, *args: None)
+    user_id = create_user(client, 'stream_user')
+    
+    def stream_summary():
+        response = client.get('/webhook/stream/learning/stream_user', headers=WEBHOOK_HEADERS)
+        assert response.mimetype == 'text/event-stream'
+        events = [json.loads(line[len('data: '):]) for line in response.get_data(as_text=True).splitlines()
+                  if line.startswith('data: ')]
+        return events[-1]['summary']
+    
+    record_interactions(client, user_id, ["I love jazz music", "jazz concerts are fun", "more jazz please"])
+    
+    assert stream_summary()['interactions_processed'] == 3
+    evidence = fact_evidence(client, user_id)
+    assert stream_summary()['interactions_processed'] == 0
+    assert fact_evidence(client, user_id) == evidence
+
+
+def test_profile_update_replaces_cached_user(client):
+    """A cached user is dropped once a profile update commits."""
+    user_id = create_user(client, 'profile_user')
+    assert client.get(f'/api/users/{user_id}').get_json()['profile']['technical_level'] != 'advanced'
+    
+    response = client.put(f'/api/users/{user_id}/profile', json={'technical_level': 'advanced'})
+    
+    assert response.status_code == 200
+    assert client.get(f'/api/users/{user_id}').get_json()['profile']['technical_level'] == 'advanced'
+
+
+def test_failed_bulk_upload_leaves_no_task(client, app_module, monkeypatch):
+    """A bulk upload whose commit fails doesn't report a queued task."""
+    def fail_commit(session):
+        raise OperationalError('COMMIT', {}, Exception('database is locked'))
+    
+    monkeypatch.setattr(Session, 'commit', fail_commit)
+    tasks_before = len(app_module.task_statuses)
+    messages = [{'message': f"message {i}"} for i in range(app_module.BULK_LEARNING_CHUNK_SIZE + 1)]
+    
+    response = client.post('/webhook/chat/bulk', headers=WEBHOOK_HEADERS,
+                           json={'user_id': 'failed_bulk_user', 'interactions': messages})
+    
+    assert response.status_code == 500
+    assert len(app_module.task_statuses) == tasks_before
+
+
+def test_large_json_response_is_gzipped(client):
+    """JSON bodies over COMPRESS_MIN_SIZE are gzipped for clients that accept it."""
+    user_id = create_user(client, 'gzip_user')
+    record_interactions(client, user_id, [f"I really enjoy long conversations about topic {i}" for i in range(20)])
+    
+    response = client.get(f'/api/users/{user_id}/interactions', headers={'Accept-Encoding': 'gzip'})
+    
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert json.loads(gzip.decompress(response.get_data()))['count'] == 20
+
+
+def test_small_json_response_is_not_gzipped(client):
+    """Small bodies are sent as they are, though they still vary on Accept-Encoding."""
+    response = client.get('/health', headers={'Accept-Encoding': 'gzip'})
+    
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    assert response.get_json()['status']
+
+
+def test_event_stream_is_not_gzipped(client):
+    """SSE streams are left uncompressed so each event reaches the client as it is sent."""
+    response = client.get('/webhook/stream/learning/nobody',
+                          headers={**WEBHOOK_HEADERS, 'Accept-Encoding': 'gzip'})
+    
+    assert response.mimetype == 'text/event-stream'
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data(as_text=True).startswith('data: ')
+
+
+def test_repeated_get_with_etag_is_not_modified(client):
+    """A GET repeated with the response's ETag gets an empty 304."""
+    user_id = create_user(client, 'etag_user')
+    record_interactions(client, user_id, ["I love jazz music"])
+    url = f'/api/users/{user_id}/interactions'
+    
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    
+    repeated = client.get(url, headers={'If-None-Match': etag})
+    
+    assert repeated.status_code == 304
+    assert repeated.get_data() == b''
+    
+    # The tag changes with the content
+    record_interactions(client, user_id, ["I also like hiking"])
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['count'] == 2
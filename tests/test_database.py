@@ -0,0 +1,70 @@
+"""
+Tests for the database manager's schema setup and migrations
+"""
+
+from datetime import datetime
+
+from sqlalchemy import MetaData, UniqueConstraint, inspect, select
+
+from database import DatabaseConfig, DatabaseManager
+from models import Base, LearnedFact
+
+
+def legacy_database(tmp_path):
+    """A database manager whose learned_facts table predates the unique key"""
+    config = DatabaseConfig()
+    config.database_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    manager = DatabaseManager(config)
+    
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    facts = metadata.tables[LearnedFact.__tablename__]
+    facts.constraints = {constraint for constraint in facts.constraints
+                         if not isinstance(constraint, UniqueConstraint)}
+    metadata.create_all(bind=manager.engine)
+    return manager, facts
+
+
+def test_create_tables_merges_duplicate_facts_before_adding_the_unique_key(tmp_path):
+    """Duplicate (user_id, category, fact_key) rows are folded into the most
+    recently updated one, with their evidence summed, and the key is added."""
+    manager, facts = legacy_database(tmp_path)
+    fact = {'user_id': 1, 'category': 'interests', 'fact_type': 'topic_interest', 'fact_key': 'interest_jazz'}
+    with manager.engine.begin() as connection:
+        connection.execute(Base.metadata.tables['users'].insert().values(id=1, username='legacy_user'))
+        connection.execute(facts.insert(), [
+            {**fact, 'fact_value': 'old', 'evidence_count': 2, 'last_updated': datetime(2024, 1, 1)},
+            {**fact, 'fact_value': 'new', 'evidence_count': 3, 'last_updated': datetime(2024, 3, 1)},
+            {**fact, 'fact_value': 'middle', 'evidence_count': None, 'last_updated': datetime(2024, 2, 1)},
+            {**fact, 'fact_key': 'interest_python', 'fact_value': 'single', 'evidence_count': 4,
+             'last_updated': datetime(2024, 1, 1)},
+        ])
+    
+    manager.create_tables()
+    
+    with manager.engine.connect() as connection:
+        rows = connection.execute(
+            select(facts.c.fact_key, facts.c.fact_value, facts.c.evidence_count).order_by(facts.c.fact_key)
+        ).all()
+    assert [tuple(row) for row in rows] == [('interest_jazz', 'new', 6), ('interest_python', 'single', 4)]
+    
+    unique_indexes = [index['column_names'] for index in inspect(manager.engine).get_indexes(facts.name)
+                      if index['unique']]
+    assert ['user_id', 'category', 'fact_key'] in unique_indexes
+
+
+def test_create_tables_is_idempotent(tmp_path):
+    """Running create_tables on an up-to-date database changes nothing."""
+    config = DatabaseConfig()
+    config.database_url = f"sqlite:///{tmp_path / 'current.db'}"
+    manager = DatabaseManager(config)
+    
+    manager.create_tables()
+    manager.create_tables()
+    
+    inspector = inspect(manager.engine)
+    assert [constraint['column_names'] for constraint in inspector.get_unique_constraints(LearnedFact.__tablename__)] \
+        == [['user_id', 'category', 'fact_key']]
+    assert not any(index['unique'] for index in inspector.get_indexes(LearnedFact.__tablename__))
+
@@ -0,0 +1,105 @@
+"""
+Tests for the learning engine's text and pattern analysis
+"""
+
+from datetime import datetime
+
+import pytest
+
+from ai.learning_engine import LearningEngine, SimpleTextAnalyzer, SimplePatternAnalyzer
+from models import UserInteraction
+
+
+@pytest.fixture
+def analyzer():
+    return SimpleTextAnalyzer()
+
+
+def test_extract_preferences_keeps_overlapping_matches(analyzer):
+    """Each preference pattern is scanned separately, so a phrase matched by
+    one pattern still counts for another pattern of the same category."""
+    preferences = analyzer.extract_preferences("I love jazz and jazz is great")
+    
+    assert preferences['likes'] == ['jazz and jazz is great', 'great']
+
+
+def test_extract_preferences_by_category(analyzer):
+    """Preferences are grouped by category and lowercased."""
+    preferences = analyzer.extract_preferences("I hate bugs. I need help with SQL")
+    
+    assert preferences == {'dislikes': ['bugs'], 'needs': ['sql']}
+
+
+def test_time_patterns_break_ties_by_first_seen():
+    """When hours or days tie, the one seen first wins, and the activity
+    distribution keeps first-seen order."""
+    timestamps = [datetime(2024, 1, 3, 15), datetime(2024, 1, 1, 9),
+                  datetime(2024, 1, 3, 9), datetime(2024, 1, 1, 15)]
+    interactions = [
+        UserInteraction(id=i, user_id=1, interaction_type='message', content='hello',
+                        timestamp=timestamp)
+        for i, timestamp in enumerate(timestamps, 1)
+    ]
+    
+    patterns = SimplePatternAnalyzer().analyze_interaction_patterns(interactions)
+    
+    assert patterns['active_hours'] == {
+        'most_active_hour': 15,
+        'most_active_day': 2,
+        'activity_distribution': {15: 2, 9: 2},
+    }
+    assert list(patterns['active_hours']['activity_distribution']) == [15, 9]
+
+
+def test_interaction_analysis_errors_are_isolated_per_row(monkeypatch):
+    """An interaction that fails analysis is reported in the result's errors
+    while the rest of the batch is still analyzed."""
+    engine = LearningEngine()
+    analyze_content = engine.text_analyzer.analyze_content
+    
+    def failing_analyze(text):
+        if text == 'broken':
+            raise ValueError("bad content")
+        return analyze_content(text)
+    
+    monkeypatch.setattr(engine.text_analyzer, 'analyze_content', failing_analyze)
+    interactions = [
+        UserInteraction(id=i, user_id=1, interaction_type='message', content=content,
+                        timestamp=datetime(2024, 1, 1, 12))
+        for i, content in enumerate(['I love python code', 'broken', 'Is SQL fast?'], 1)
+    ]
+    
+    result = engine.process_user_interactions(1, interactions)
+    
+    assert result.errors == ['Interaction 2: bad content']
+    assert interactions[0].sentiment > 0
+    assert 'python' in interactions[0].topics
+    assert interactions[1].intent is None
+    assert interactions[2].intent == 'question'
+
+
+@pytest.mark.parametrize('text, intent', [
+    ("That was helpful.", 'statement'),
+    ("Is this working?", 'question'),
+    ("Somehow it works now", 'statement'),
+    ("I will likely be late", 'statement'),
+])
+def test_classify_intent_ignores_keywords_inside_longer_words(analyzer, text, intent):
+    """Intent keywords only match whole words, so "helpful" is not a help
+    request and "this" is not the greeting "hi"."""
+    assert analyzer.classify_intent(text) == intent
+
+
+@pytest.mark.parametrize('text, intent', [
+    ("Can you help me with this?", 'help_request'),
+    ("Please tell me more", 'help_request'),
+    ("I love jazz", 'preference_expression'),
+    ("Thank you so much", 'gratitude'),
+    ("Good morning!", 'greeting'),
+    ("HELLO there", 'greeting'),
+    ("Hi, how are you?", 'help_request'),
+])
+def test_classify_intent_matches_whole_keywords(analyzer, text, intent):
+    """Keywords and phrases match case-insensitively, and the highest
+    priority intent wins when several are present."""
+    assert analyzer.classify_intent(text) == intent
@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Any, Union
 from functools import wraps
 import hashlib
 import secrets
+import threading
+import time
 
 
 def setup_logging(level: str = "INFO", log_file: Optional[str] = None) -> None:
@@ -181,4 +183,42 @@ class Timer:
     def duration(self) -> Optional[float]:
         if self.start_time and self.end_time:
             return (self.end_time - self.start_time).total_seconds()
-        return None
\ No newline at end of file
+        return None
+
+
+class LocalTTLCache:
+    """Thread-safe in-process cache whose entries expire after `ttl` seconds
+    
+    Holds at most `max_size` entries; when full, the oldest insertion is
+    evicted. Safe to share between request and background threads.
+    """
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """Get a live entry's value, or `default` on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > time.time():
+            return entry[1]
+        return default
+    
+    def set(self, key, value) -> None:
+        """Store a value for `ttl` seconds, as the newest entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_size:
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[key] = (time.time() + self.ttl, value)
+    
+    def pop(self, key) -> None:
+        """Drop an entry if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def __len__(self) -> int:
+        return len(self._entries)